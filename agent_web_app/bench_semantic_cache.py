@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+
+# Ensure we can import from the project root (parent directory)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_web_app.core.semantic_cache import SemanticCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL = "phi3:latest"
+
+
+def load_query_log(path: str, include_history: bool):
+    """Returns [(intent, query)]. Intents label paraphrases so wrong hits can be counted."""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            intent, query = line.split("\t", 1)
+            entries.append((intent, query))
+
+    if include_history:
+        # Real user messages from saved sessions. Texts already in the log keep its intent;
+        # any other distinct text is its own intent.
+        known = {query.strip().lower(): intent for intent, query in entries}
+        for filename in sorted(glob.glob(os.path.join(HERE, "history", "*.json"))):
+            with open(filename) as f:
+                session = json.load(f)
+            for msg in session.get("messages", []):
+                if msg["role"] == "user":
+                    text = msg["content"].strip().lower()
+                    entries.append((known.get(text, "history:" + text), msg["content"]))
+    return entries
+
+
+def replay(entries, threshold: float, llm_latency: float, live: bool):
+    cache = SemanticCache(threshold=threshold)
+    llm = None
+    if live:
+        from agent_web_app.core.llm import LLMProvider
+        llm = LLMProvider()
+
+    answers = {}       # query -> intent of the answer stored for it
+    hits = wrong_hits = 0
+    lookup_time = 0.0
+    generation_time = 0.0
+
+    for intent, query in entries:
+        started = time.perf_counter()
+        hit = cache.lookup(query, MODEL)
+        lookup_time += time.perf_counter() - started
+
+        if hit:
+            hits += 1
+            if answers[hit.query] != intent:
+                wrong_hits += 1
+                print(f"  WRONG HIT ({hit.similarity:.2f}): '{query}' -> '{hit.query}'")
+            continue
+
+        if live:
+            started = time.perf_counter()
+            answer = asyncio.run(llm.generate_async(query, model=MODEL))
+            latency = time.perf_counter() - started
+        else:
+            answer, latency = f"answer for {intent}", llm_latency
+        generation_time += latency
+        cache.store(query, MODEL, answer, latency=latency)
+        answers[query] = intent
+
+    total = len(entries)
+    stats = cache.stats()
+    print(f"\nthreshold={threshold}  queries={total}  hits={hits}  wrong_hits={wrong_hits}")
+    print(f"  hit rate:            {hits / total:.1%}")
+    print(f"  precision:           {(hits - wrong_hits) / hits:.1%}" if hits else "  precision:           n/a")
+    print(f"  avg lookup overhead: {lookup_time / total * 1000:.3f} ms")
+    print(f"  LLM time spent:      {generation_time:.2f} s")
+    print(f"  LLM time saved:      {stats['latency_saved_s']:.2f} s (net of lookups: {stats['latency_saved_s'] - lookup_time:.2f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a query log through the semantic cache")
+    parser.add_argument("--log", default=os.path.join(HERE, "bench_queries.tsv"), help="TSV of intent<TAB>query")
+    parser.add_argument("--no-history", action="store_true", help="Do not append user messages from history/")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.65, 0.75, 0.82, 0.9])
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Simulated seconds per LLM call on a miss")
+    parser.add_argument("--live", action="store_true", help="Call the real model on misses (needs OLLAMA_HOST)")
+    args = parser.parse_args()
+
+    entries = load_query_log(args.log, include_history=not args.no_history)
+    for threshold in args.threshold:
+        replay(entries, threshold, args.llm_latency, args.live)
+
+
+if __name__ == "__main__":
+    main()
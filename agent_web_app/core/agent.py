@@ -4,9 +4,23 @@ from agent_web_app.tools.search import WebSearchTool
 from agent_web_app.tools.calculator import CalculatorTool
 from agent_web_app.tools.wikipedia_tool import WikipediaTool
 from agent_web_app.tools.image_tool import ImageSearchTool
+from ai_agent_project.src.core.context_budget import ContextBudget, format_usage
+from ai_agent_project.src.core.prompt_layout import PromptTemplate
 import json
 import re
 
+# Compiled once; each legacy step only fills in the fields
+STEP_PROMPT = PromptTemplate("""
+{task}
+Context: {context}
+
+{tools}
+- finish(answer): Return the final answer.
+
+What should I do?
+Return JSON format: {{"tool": "tool_name", "args": "arguments"}}
+""")
+
 class Agent:
     def __init__(self, llm_provider):
         self.llm = llm_provider
@@ -20,22 +34,21 @@ class Agent:
         self.registry.register(WikipediaTool())
         
         self.history = []
+        self.context_usage = []  # token accounting of each LLM-decided step
+
+        # The accumulated tool results get most of the window; the oldest are cut first
+        self.context_budget = ContextBudget(
+            window=llm_provider.num_ctx,
+            reserve_output=llm_provider.num_predict,
+            shares={"task": 0.15, "tools": 0.15, "context": 0.7},
+            tokenizer=llm_provider.tokenizer,
+            keep={"context": "tail"},
+            stable=("tools",),
+        )
 
     async def run(self, goal: str):
-        # 1. Plan (Sync for now unless we optimize Planner too, but let's make it async calling LLM)
-        # Actually Planner uses self.llm.generate which is sync. We should make planner async too ideally.
-        # For now, let's wrap planner call or just keep it sync (it's fast enough with phi3).
-        # Wait, if we are in async run, we should try to be non-blocking.
-        # Let's fix Planner.create_plan to use generate_async if possible or just wrap it here.
-        
-        # But wait, Planner.create_plan calls llm.generate. 
-        # Modifying Planner is good.
-        # Let's assume Planner is Sync for this step but we'll optimize it later or now.
-        # Let's just run it in thread to be safe.
-        import asyncio
-        from functools import partial
-        loop = asyncio.get_event_loop()
-        steps = await loop.run_in_executor(None, self.planner.create_plan, goal)
+        # 1. Plan (native async LLM call, no executor thread held while the model runs)
+        steps = await self.planner.create_plan_async(goal)
         
         context = ""
         
@@ -52,18 +65,14 @@ class Agent:
                 }
             else:
                 # Legacy text-step logic: Ask LLM to decide (Async)
-                tools_list = self.registry.get_prompt_text()
-                prompt = f"""
-                Goal: {goal}
-                Current Step: {step}
-                Context: {context}
-                
-                {tools_list}
-                - finish(answer): Return the final answer.
-                
-                What should I do?
-                Return JSON format: {{"tool": "tool_name", "args": "arguments"}}
-                """
+                sections, usage = self.context_budget.fit({
+                    "task": f"Goal: {goal}\nCurrent Step: {step}",
+                    "context": context,
+                    "tools": self.registry.get_prompt_text(),
+                })
+                self.context_usage.append(usage)
+                print(f"[Agent] Context: {format_usage(usage)}")
+                prompt = STEP_PROMPT.fill(**sections)
                 
                 response = await self.llm.generate_async(prompt, model="phi3:latest")
                 
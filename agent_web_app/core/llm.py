@@ -1,56 +1,164 @@
-import requests
 import os
 import json
+from typing import Dict, Any, Tuple, Optional
+from ai_agent_project.src.utils.http import get_transport, get_async_transport
+from ai_agent_project.src.core.llm_cache import get_llm_cache
+from ai_agent_project.src.utils.singleflight import get_single_flight
+from ai_agent_project.src.utils.tokens import get_tokenizer
+from ai_agent_project.src.core.llm_metrics import get_prefill_stats, timings_from_ollama
 
 class LLMProvider:
-    """Wrapper for Ollama API with dynamic model support."""
-    
-    def __init__(self, default_model="phi3:latest", host="http://192.168.1.13:11434"):
+    """
+    Wrapper for Ollama (or any OpenAI-compatible endpoint) with dynamic model support.
+
+    `generate_async` is the native path and talks to the server over a pooled
+    asyncio HTTP client; `generate` is a thin blocking adapter that builds the
+    same request and sends it over the pooled sync transport.
+
+    Requests made with temperature 0 are served from the shared response cache.
+    Identical requests that overlap in time (any temperature) share one call.
+
+    The context window (LLM_NUM_CTX) is sent with every request. A prompt that
+    would not fit next to the reply budget (LLM_NUM_PREDICT) is cut here, with a
+    log line, instead of being silently truncated by the server.
+    """
+
+    def __init__(self, default_model="phi3:latest", host="http://192.168.1.13:11434", api_style: str = None):
         self.default_model = default_model
         self.host = os.getenv("OLLAMA_HOST", host)
-        self.base_url = f"{self.host}/api/chat"
+        # "ollama" -> /api/chat, "openai" -> /v1/chat/completions (vLLM, llama.cpp server, LM Studio, ...)
+        self.api_style = (api_style or os.getenv("LLM_API_STYLE", "ollama")).lower()
+        self.api_key = os.getenv("LLM_API_KEY")
+        if self.api_style == "openai":
+            self.base_url = f"{self.host}/v1/chat/completions"
+        else:
+            self.base_url = f"{self.host}/api/chat"
+        self.cache = get_llm_cache()
+        self.flight = get_single_flight("llm")
+        self.num_ctx = int(os.getenv("LLM_NUM_CTX", "4096"))
+        self.num_predict = int(os.getenv("LLM_NUM_PREDICT", "300"))
+        self.keep_alive = os.getenv("LLM_KEEP_ALIVE", "30m")  # keeps the model and its KV cache loaded between requests
+        self.tokenizer = get_tokenizer()
+
+    def _fit_prompt(self, prompt: str, system_prompt: str) -> str:
+        """Keeps the end of an oversized prompt (where the instructions are), dropping the start."""
+        limit = self.num_ctx - self.num_predict - self.tokenizer.count(system_prompt)
+        size = self.tokenizer.count(prompt)
+        if size <= limit:
+            return prompt
+        print(f"[LLM] Prompt is {size} tokens, over the {limit} left in num_ctx={self.num_ctx}; trimming its start.")
+        return self.tokenizer.truncate(prompt, max(limit, 0), keep="tail")
+
+    def _build_request(self, prompt: str, system_prompt: str, model: str, temperature: float) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Returns (payload, headers) for the configured API style."""
+        prompt = self._fit_prompt(prompt, system_prompt)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        headers = {}
+        if self.api_style == "openai":
+            payload = {
+                "model": model,
+                "messages": messages,
+                "stream": False,
+                "temperature": temperature,
+                "max_tokens": self.num_predict,
+                "top_p": 0.9
+            }
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            return payload, headers
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": temperature,
+                "num_ctx": self.num_ctx,
+                "num_predict": self.num_predict,
+                "top_p": 0.9
+            }
+        }
+        return payload, headers
+
+    @staticmethod
+    def _options(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return payload.get("options") or {k: payload[k] for k in ("temperature", "max_tokens", "top_p")}
 
-    def generate(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", model: str = None) -> str:
+    def _request_key(self, payload: Dict[str, Any], system_prompt: str, prompt: str) -> str:
+        """Identity of a request, sampled or not; identical in-flight requests share one call."""
+        return self.cache.make_key(f"{self.api_style}:{self.host}", payload["model"], system_prompt, prompt, self._options(payload))
+
+    def _cache_key(self, payload: Dict[str, Any], system_prompt: str, prompt: str) -> Optional[str]:
+        return self.cache.key_for(f"{self.api_style}:{self.host}", payload["model"], system_prompt, prompt, self._options(payload))
+
+    def _parse_response(self, data: Dict[str, Any]) -> str:
+        if self.api_style == "openai":
+            return data["choices"][0]["message"]["content"]
+        get_prefill_stats().record(timings_from_ollama(data))
+        return data["message"]["content"]
+
+    def generate(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", model: str = None, temperature: float = 0.2) -> str:
         """
         Generate text using a specific model.
-        
+
         Args:
             prompt: User prompt
             system_prompt: System instruction
             model: Optional model override. If None, uses default_model.
+            temperature: Sampling temperature. 0 makes the call deterministic and cacheable.
         """
         target_model = model or self.default_model
-        
-        payload = {
-            "model": target_model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            "stream": False,
-            "options": {
-                "temperature": 0.2,
-                "num_ctx": 2048,
-                "num_predict": 300,
-                "top_p": 0.9
-            }
-        }
-        
-        try:
-            print(f"[LLM] Calling {target_model}...")
-            response = requests.post(self.base_url, json=payload)
-            response.raise_for_status()
-            return response.json()["message"]["content"]
-        except Exception as e:
-            print(f"[LLM] Error calling {target_model}: {e}")
-            return f"Error: {str(e)}"
-
-    async def generate_async(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", model: str = None) -> str:
-        """Async version of generate using thread pool."""
-        import asyncio
-        from functools import partial
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, 
-            partial(self.generate, prompt, system_prompt, model)
-        )
+        payload, headers = self._build_request(prompt, system_prompt, target_model, temperature)
+        key = self._cache_key(payload, system_prompt, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"[LLM] Cache hit for {target_model}.")
+            return cached
+
+        def call() -> str:
+            try:
+                print(f"[LLM] Calling {target_model}...")
+                response = get_transport().post(self.base_url, json=payload, headers=headers)
+                response.raise_for_status()
+                text = self._parse_response(response.json())
+                self.cache.put(key, text)
+                return text
+            except Exception as e:
+                print(f"[LLM] Error calling {target_model}: {e}")
+                return f"Error: {str(e)}"
+
+        text, shared = self.flight.do(self._request_key(payload, system_prompt, prompt), call)
+        if shared:
+            print(f"[LLM] Joined an identical in-flight request to {target_model}.")
+        return text
+
+    async def generate_async(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", model: str = None, temperature: float = 0.2) -> str:
+        """Native async version of generate; does not occupy a worker thread while waiting on the model."""
+        target_model = model or self.default_model
+        payload, headers = self._build_request(prompt, system_prompt, target_model, temperature)
+        key = self._cache_key(payload, system_prompt, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"[LLM] Cache hit for {target_model}.")
+            return cached
+
+        async def call() -> str:
+            try:
+                print(f"[LLM] Calling {target_model} (async)...")
+                response = await get_async_transport().post(self.base_url, json=payload, headers=headers)
+                response.raise_for_status()
+                text = self._parse_response(response.json())
+                self.cache.put(key, text)
+                return text
+            except Exception as e:
+                print(f"[LLM] Error calling {target_model}: {e}")
+                return f"Error: {str(e)}"
+
+        text, shared = await self.flight.do_async(self._request_key(payload, system_prompt, prompt), call)
+        if shared:
+            print(f"[LLM] Joined an identical in-flight request to {target_model}.")
+        return text
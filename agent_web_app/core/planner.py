@@ -1,31 +1,35 @@
 import json
 import re
+from ai_agent_project.src.core.prompt_layout import PromptLayout, PromptTemplate
+
+# Static part of the planning prompt, sent as the system message so the server can
+# reuse its prefill across plans; only the goal differs between requests.
+PLANNER_INSTRUCTIONS = """Available Tools:
+1. web_search(query): Search internet for text.
+2. image_search(query): Search internet for images.
+3. wikipedia(query): Search Wikipedia.
+4. calculator(expression): Math calculations.
+
+Break the goal down into simple, sequential steps that use these tools.
+Each step should ideally correspond to one tool call.
+Do NOT include manual steps like 'Open browser', 'Click link', 'Type in search bar'.
+
+Return ONLY a JSON list of objects.
+Example: [{"tool_name": "wikipedia", "input_value": "Taj Mahal"}, {"tool_name": "image_search", "input_value": "Taj Mahal"}]
+"""
+PLANNER_STEP = PromptTemplate("Goal: {goal}")
 
 class Planner:
     def __init__(self, llm):
         self.llm = llm
         self.plan = []
+        self.layout = PromptLayout(PLANNER_INSTRUCTIONS, tokenizer=llm.tokenizer)
 
-    def create_plan(self, goal: str):
-        print(f"[Planner] Creating plan for: {goal}")
-        prompt = f"""
-        Goal: {goal}
-        
-        Available Tools:
-        1. web_search(query): Search internet for text.
-        2. image_search(query): Search internet for images.
-        3. wikipedia(query): Search Wikipedia.
-        4. calculator(expression): Math calculations.
-        
-        Break this down into simple, sequential steps that use these tools.
-        Each step should ideally correspond to one tool call.
-        Do NOT include manual steps like 'Open browser', 'Click link', 'Type in search bar'.
-        
-        Return ONLY a JSON list of objects.
-        Example: [{{"tool_name": "wikipedia", "input_value": "Taj Mahal"}}, {{"tool_name": "image_search", "input_value": "Taj Mahal"}}]
-        """
-        
-        response = self.llm.generate(prompt, model="phi3:latest")
+    def _build_prompt(self, goal: str):
+        """Returns (system_prompt, prompt)."""
+        return self.layout.build(step=PLANNER_STEP.fill(goal=goal))
+
+    def _parse_plan(self, goal: str, response: str):
         try:
             # Phi-3 might add text, so we hunt for the JSON list
             match = re.search(r'\[.*\]', response, re.DOTALL)
@@ -34,10 +38,23 @@ class Planner:
             else:
                 # Fallback: Split by lines if no JSON
                 self.plan = [line.strip("- *") for line in response.split("\n") if line.strip()]
-                
+
             print(f"[Planner] Plan: {self.plan}")
             return self.plan
         except Exception as e:
             print(f"[Planner] Error parsing plan: {e}")
             self.plan = [goal] # Fallback to single step
             return self.plan
+
+    # Plans are generated at temperature 0 so identical goals are served from the response cache
+    def create_plan(self, goal: str):
+        print(f"[Planner] Creating plan for: {goal}")
+        system_prompt, prompt = self._build_prompt(goal)
+        response = self.llm.generate(prompt, system_prompt=system_prompt, model="phi3:latest", temperature=0.0)
+        return self._parse_plan(goal, response)
+
+    async def create_plan_async(self, goal: str):
+        print(f"[Planner] Creating plan for: {goal}")
+        system_prompt, prompt = self._build_prompt(goal)
+        response = await self.llm.generate_async(prompt, system_prompt=system_prompt, model="phi3:latest", temperature=0.0)
+        return self._parse_plan(goal, response)
@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from pydantic import BaseModel
+from ai_agent_project.src.utils.embedding import HashingEmbedder
+
+
+class CacheHit(BaseModel):
+    answer: str
+    query: str          # the stored query that matched
+    similarity: float
+
+
+class _Namespace:
+    """Embeddings for one model, stored as rows of a contiguous float32 matrix."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.queries: List[str] = []
+        self.answers: List[str] = []
+        self.created: List[float] = []
+        self.last_used: List[float] = []
+        self.latency: List[float] = []  # seconds the original generation took
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def remove(self, idx: int):
+        """Swap-remove a row so the matrix stays dense."""
+        last = len(self.queries) - 1
+        if idx != last:
+            self.vectors[idx] = self.vectors[last]
+            for column in (self.queries, self.answers, self.created, self.last_used, self.latency):
+                column[idx] = column[last]
+        for column in (self.queries, self.answers, self.created, self.last_used, self.latency):
+            column.pop()
+
+
+class SemanticCache:
+    """
+    Near-duplicate prompt cache for chat answers.
+
+    Queries are embedded locally (no network) and compared by cosine similarity
+    against earlier queries sent to the same model. A match above `threshold`
+    that is younger than `ttl` seconds returns the stored answer. Each model
+    namespace holds at most `capacity` entries; the least recently used one is
+    evicted first.
+    """
+
+    def __init__(self, threshold: float = 0.82, ttl: float = 3600, capacity: int = 1000,
+                 embed_fn: Optional[Callable[[str], np.ndarray]] = None, dim: int = 512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self.embed_fn = embed_fn or HashingEmbedder(dim=dim)
+        self.dim = dim
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.latency_saved = 0.0
+
+    def _namespace(self, model: str) -> _Namespace:
+        ns = self._namespaces.get(model)
+        if ns is None:
+            ns = self._namespaces[model] = _Namespace(self.dim, self.capacity)
+        return ns
+
+    def lookup(self, query: str, model: str) -> Optional[CacheHit]:
+        vec = self.embed_fn(query)
+        now = time.time()
+        with self._lock:
+            ns = self._namespaces.get(model)
+            if ns is None or not len(ns):
+                self.misses += 1
+                return None
+
+            scores = ns.vectors[:len(ns)] @ vec
+            # Best candidates first; expired ones are dropped as they are encountered
+            for idx in np.argsort(-scores):
+                idx = int(idx)
+                if scores[idx] < self.threshold:
+                    break
+                if now - ns.created[idx] > self.ttl:
+                    continue
+                ns.last_used[idx] = now
+                self.hits += 1
+                self.latency_saved += ns.latency[idx]
+                return CacheHit(answer=ns.answers[idx], query=ns.queries[idx], similarity=float(scores[idx]))
+
+            self.misses += 1
+            self._purge_expired(ns, now)
+            return None
+
+    def store(self, query: str, model: str, answer: str, latency: float = 0.0):
+        vec = self.embed_fn(query)
+        now = time.time()
+        with self._lock:
+            ns = self._namespace(model)
+            self._purge_expired(ns, now)
+            if len(ns) >= self.capacity:
+                ns.remove(int(np.argmin(ns.last_used)))
+                self.evictions += 1
+            idx = len(ns)
+            ns.vectors[idx] = vec
+            ns.queries.append(query)
+            ns.answers.append(answer)
+            ns.created.append(now)
+            ns.last_used.append(now)
+            ns.latency.append(latency)
+
+    def _purge_expired(self, ns: _Namespace, now: float):
+        for idx in range(len(ns) - 1, -1, -1):
+            if now - ns.created[idx] > self.ttl:
+                ns.remove(idx)
+                self.expired += 1
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_s": round(self.latency_saved, 3),
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "threshold": self.threshold,
+            "entries": {model: len(ns) for model, ns in self._namespaces.items()},
+        }
@@ -1,5 +1,9 @@
+import inspect
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
 
 class Tool(ABC):
     """Abstract base class for all tools."""
@@ -10,15 +14,41 @@ class Tool(ABC):
     async def execute(self, **kwargs) -> str:
         pass
 
+def _tool_call(tool: Tool) -> Dict[str, Any]:
+    """OpenAI / Ollama `tools` entry derived from the signature of `execute`."""
+    properties, required = {}, []
+    for param in inspect.signature(tool.execute).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        properties[param.name] = {"type": _JSON_TYPES.get(param.annotation, "string")}
+        if param.default is param.empty:
+            required.append(param.name)
+    return {"type": "function", "function": {
+        "name": tool.name, "description": tool.description,
+        "parameters": {"type": "object", "properties": properties, "required": required}}}
+
 class ToolRegistry:
-    """Registry to manage and discover tools."""
+    """
+    Registry to manage and discover tools.
+
+    The prompt text and tool-call definitions are built once and reused until
+    the next `register`, which bumps `version`.
+    """
     def __init__(self):
         self._tools: Dict[str, Tool] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self._prompt_text: Optional[str] = None
+        self._tool_calls: Optional[List[Dict[str, Any]]] = None
 
     def register(self, tool: Tool):
         if not tool.name:
             raise ValueError("Tool name cannot be empty")
-        self._tools[tool.name] = tool
+        with self._lock:
+            self._tools[tool.name] = tool
+            self.version += 1
+            self._prompt_text = None
+            self._tool_calls = None
         print(f"[Registry] Registered tool: {tool.name}")
 
     def get(self, name: str) -> Tool:
@@ -29,7 +59,21 @@ class ToolRegistry:
 
     def get_prompt_text(self) -> str:
         """Generates the tools section for the prompt."""
-        text = "Available Tools:\n"
-        for tool in self._tools.values():
-            text += f"- {tool.name}: {tool.description}\n"
+        text = self._prompt_text
+        if text is None:
+            with self._lock:
+                if self._prompt_text is None:
+                    self._prompt_text = "Available Tools:\n" + "".join(
+                        f"- {tool.name}: {tool.description}\n" for tool in self._tools.values())
+                text = self._prompt_text
         return text
+
+    def to_tool_calls(self) -> List[Dict[str, Any]]:
+        """Tool definitions in the OpenAI / Ollama function-calling format."""
+        calls = self._tool_calls
+        if calls is None:
+            with self._lock:
+                if self._tool_calls is None:
+                    self._tool_calls = [_tool_call(tool) for tool in self._tools.values()]
+                calls = self._tool_calls
+        return calls
@@ -0,0 +1,139 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Optional
+from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.cache import TwoTierCache
+from ai_agent_project.src.utils.singleflight import get_single_flight
+
+DEFAULT_PATH = os.path.join(settings.CACHE_DIR, "tool_results.sqlite")  # beside the LLM and page caches
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCTUATION = "\"'`.,;:!?()[]{} "
+
+
+def normalize_query(query: str) -> str:
+    """Unicode-normalized, case-folded, single-spaced, without surrounding quotes or punctuation."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return _SPACES.sub(" ", query).strip(_EDGE_PUNCTUATION)
+
+
+class ToolResultCache:
+    """
+    Tool results shared across restarts and uvicorn workers: an in-memory LRU
+    in front of a SQLite file (see TwoTierCache).
+
+    Successful results live for `ttl` seconds. Failures ("Search failed: ...",
+    "Page not found.") are cached too, but only for `negative_ttl`, so a
+    retry storm is absorbed without pinning a transient error.
+    """
+
+    def __init__(self, path: Optional[str], ttl: float = 3600, negative_ttl: float = 60,
+                 max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.store = TwoTierCache(path, max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, table="tool_results")
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool: str, name: str):
+        with self._lock:
+            counters = self._counters.setdefault(tool, {"hits": 0, "negative_hits": 0, "misses": 0})
+            counters[name] += 1
+
+    @staticmethod
+    def make_key(tool: str, args: Dict[str, Any]) -> str:
+        normalized = {k: normalize_query(v) if isinstance(v, str) else v for k, v in args.items()}
+        raw = json.dumps({"tool": tool, "args": normalized}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, tool: str, args: Dict[str, Any]) -> Optional[str]:
+        entry = self.store.get(self.make_key(tool, args))
+        if entry is None:
+            self._count(tool, "misses")
+            return None
+        self._count(tool, "negative_hits" if entry["negative"] else "hits")
+        return entry["result"]
+
+    def set(self, tool: str, args: Dict[str, Any], result: str, negative: bool = False, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else (self.negative_ttl if negative else self.ttl)
+        self.store.set(self.make_key(tool, args), {"result": result, "negative": negative}, ttl=ttl)
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {tool: dict(counters) for tool, counters in self._counters.items()}
+        for counters in tools.values():
+            lookups = sum(counters.values())
+            counters["hit_rate"] = round((counters["hits"] + counters["negative_hits"]) / lookups, 4) if lookups else 0.0
+        store = self.store.stats()
+        expired = store["memory"]["expired"] + store.get("disk", {}).get("expired", 0)
+        return {"ttl": self.ttl, "negative_ttl": self.negative_ttl, "expired": expired, "tools": tools, "store": store}
+
+
+def _bind(signature: inspect.Signature, args, kwargs) -> Dict[str, Any]:
+    """Arguments by name with defaults applied, so f("x") and f("x", 3) share an entry."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+_tool_cache: Optional[ToolResultCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    """Process-wide tool result cache configured from TOOL_CACHE_* environment variables."""
+    global _tool_cache
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                persist = os.getenv("TOOL_CACHE_PERSIST", "true").lower() == "true"
+                _tool_cache = ToolResultCache(
+                    os.getenv("TOOL_CACHE_PATH", DEFAULT_PATH) if persist else None,
+                    ttl=float(os.getenv("TOOL_CACHE_TTL", "3600")),
+                    negative_ttl=float(os.getenv("TOOL_CACHE_NEGATIVE_TTL", "60")),
+                    max_entries=int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1000")),
+                    max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+                )
+    return _tool_cache
+
+
+def cached_tool(tool: str, is_negative: Callable[[str], bool] = lambda result: False, ttl: Optional[float] = None):
+    """
+    Decorator replacing `functools.lru_cache` on a tool function: results go
+    through the shared tool cache, and results for which `is_negative` is true
+    expire after the short negative TTL. Concurrent calls with the same
+    normalized arguments run the function once.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        flight = get_single_flight(f"tool:{tool}")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_tool_cache()
+            call = _bind(signature, args, kwargs)
+            result = cache.get(tool, call)
+            if result is not None:
+                return result
+
+            def run() -> str:
+                result = fn(*args, **kwargs)
+                negative = is_negative(result)
+                cache.set(tool, call, result, negative=negative, ttl=None if negative else ttl)
+                return result
+
+            # identical calls already running (e.g. many users asking the same trending question) are joined
+            result, shared = flight.do(cache.make_key(tool, call), run)
+            if shared:
+                print(f"[Tool:{tool}] Joined an identical in-flight call.")
+            return result
+        return wrapper
+    return decorator
@@ -4,11 +4,19 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import os
 import json
+import time
 from typing import List, Dict, Optional, Any
 
 from agent_web_app.core.llm import LLMProvider
 from agent_web_app.core.agent import Agent
 from agent_web_app.core.session_manager import SessionManager
+from agent_web_app.core.semantic_cache import SemanticCache
+from ai_agent_project.src.utils.http import get_transport, get_async_transport
+from ai_agent_project.src.core.llm_cache import get_llm_cache
+from ai_agent_project.src.core.llm_metrics import get_prefill_stats
+from ai_agent_project.src.utils.page_cache import get_page_cache
+from ai_agent_project.src.utils.singleflight import single_flight_stats
+from agent_web_app.core.tool_cache import get_tool_cache
 
 # Configuration
 HISTORY_DIR = os.path.join(os.path.dirname(__file__), "history")
@@ -21,6 +29,12 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 # Initialize Services
 session_manager = SessionManager(HISTORY_DIR)
 llm = LLMProvider()
+# Paraphrased questions ("who is CEO of microsoft" / "Microsoft's current CEO?") reuse earlier answers
+semantic_cache = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.82")),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+    capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY", "1000")),
+)
 
 # --- Models ---
 class ChatRequest(BaseModel):
@@ -53,6 +67,15 @@ async def get_session(session_id: str):
         return {"error": "Session not found"}
     return sess
 
+@app.get("/api/stats")
+async def get_stats():
+    return {"http": get_transport().stats(), "http_async": get_async_transport().stats(),
+            "llm_cache": get_llm_cache().stats(), "semantic_cache": semantic_cache.stats(),
+            "prefill": get_prefill_stats().stats(),
+            "page_cache": get_page_cache().stats() if get_page_cache() else {"enabled": False},
+            "single_flight": single_flight_stats(),
+            "tool_cache": get_tool_cache().stats()}
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     with open(os.path.join(static_dir, "index.html")) as f:
@@ -70,7 +93,16 @@ async def chat_endpoint(request: ChatRequest):
     final_response_text = ""
     steps = []
 
-    if request.search_mode:
+    # Namespaced by the model that produces the final answer
+    cache_model = "search:llama3.1:8b" if request.search_mode else "phi3:latest"
+    hit = semantic_cache.lookup(query, cache_model)
+
+    if hit:
+        print(f"[Server] Semantic cache hit ({hit.similarity:.2f}) for '{hit.query}'.")
+        final_response_text = hit.answer
+
+    elif request.search_mode:
+        started = time.perf_counter()
         print("[Server] Search Mode ON. Initializing Agent...")
         # 1. Initialize Agent (New Tool Registry is auto-init inside)
         agent = Agent(llm)
@@ -92,12 +124,17 @@ async def chat_endpoint(request: ChatRequest):
         
         final_response_text = final_answer
         steps = agent.history
+        if not final_answer.startswith("Error:"):
+            semantic_cache.store(query, cache_model, final_answer, latency=time.perf_counter() - started)
         
     else:
         print("[Server] Normal Chat Mode. Using phi3:latest...")
+        started = time.perf_counter()
         response = await llm.generate_async(query, model="phi3:latest")
         final_response_text = response
         steps = []
+        if not response.startswith("Error:"):
+            semantic_cache.store(query, cache_model, response, latency=time.perf_counter() - started)
 
     # Store AI Response
     if session_id:
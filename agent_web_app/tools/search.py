@@ -1,9 +1,8 @@
 from ddgs import DDGS
-import requests
-from bs4 import BeautifulSoup
-import re
 from agent_web_app.core.llm import LLMProvider
 from agent_web_app.core.tool import Tool
+from agent_web_app.core.tool_cache import cached_tool
+from ai_agent_project.src.utils.html_extract import fetch_page_text
 
 class WebSearchTool(Tool):
     name = "web_search"
@@ -14,18 +13,7 @@ class WebSearchTool(Tool):
         pass
 
     def _fetch_page_content(self, url: str, timeout: int = 10):
-        try:
-            headers = {"User-Agent": "Mozilla/5.0"}
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            for el in soup(["script", "style", "nav", "footer"]):
-                el.decompose()
-            text = soup.get_text(separator=' ', strip=True)
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text[:2500]
-        except:
-            return None
+        return fetch_page_text(url, timeout=timeout, max_chars=2500, headers={"User-Agent": "Mozilla/5.0"}, suffix="")
 
     async def execute(self, query: str, max_results: int = 3) -> str:
         import asyncio
@@ -33,9 +21,7 @@ class WebSearchTool(Tool):
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, partial(cached_search, query, max_results))
 
-from functools import lru_cache
-
-@lru_cache(maxsize=100)
+@cached_tool("web_search", is_negative=lambda result: result.startswith("Search failed") or result == "No results found.")
 def cached_search(query: str, max_results: int = 3) -> str:
     print(f"[Tool:WebSearch] Searching for: {query} (Cache Miss)")
     results = []
@@ -1,5 +1,7 @@
+import os
 import wikipedia
 from agent_web_app.core.tool import Tool
+from agent_web_app.core.tool_cache import cached_tool
 
 class WikipediaTool(Tool):
     name = "wikipedia"
@@ -11,9 +13,8 @@ class WikipediaTool(Tool):
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, partial(cached_wikipedia, query))
 
-from functools import lru_cache
-
-@lru_cache(maxsize=100)
+@cached_tool("wikipedia", ttl=float(os.getenv("WIKIPEDIA_CACHE_TTL", "86400")),
+             is_negative=lambda result: result == "Page not found." or result.startswith("Wikipedia error"))
 def cached_wikipedia(query: str) -> str:
     print(f"[Tool:Wikipedia] Searching for: {query} (Cache Miss)")
     try:
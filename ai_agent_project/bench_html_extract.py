@@ -0,0 +1,80 @@
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+# Ensure we can import from the project root (parent directory)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from ai_agent_project.src.utils.html_extract import extract_text, etree
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLUTTER = ["script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "header", "aside", "form"]
+
+
+def soup_extract(html: str, max_chars: int, features: str) -> str:
+    """What the fetchers did before: build the whole tree, drop clutter, truncate."""
+    soup = BeautifulSoup(html, features)
+    for element in soup(CLUTTER):
+        element.decompose()
+    text = soup.get_text(separator=" ", strip=True)
+    return re.sub(r"\s+", " ", text).strip()[:max_chars]
+
+
+def bench(fn, docs, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        outputs = [fn(html) for _, html in docs]
+        best = min(best, time.perf_counter() - started)
+    return best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction over saved pages")
+    parser.add_argument("--fixtures", default=os.path.join(HERE, "fixtures", "html"))
+    parser.add_argument("--max-chars", type=int, default=2500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, "rb") as f:
+            docs.append((os.path.basename(path), f.read()))
+    if not docs:
+        print(f"No fixtures in {args.fixtures}")
+        return
+    total_kb = sum(len(html) for _, html in docs) / 1024
+    print(f"{len(docs)} pages, {total_kb:.0f} KB, text budget {args.max_chars} chars, best of {args.repeat}\n")
+
+    candidates = [("bs4 html.parser (full tree)", lambda h: soup_extract(h.decode("utf-8", "replace"), args.max_chars, "html.parser"))]
+    if etree is not None:
+        candidates.append(("bs4 lxml (full tree)", lambda h: soup_extract(h.decode("utf-8", "replace"), args.max_chars, "lxml")))
+        candidates.append(("extract_text lxml", lambda h: extract_text(h, args.max_chars, backend="lxml")))
+    candidates.append(("extract_text stdlib", lambda h: extract_text(h, args.max_chars, backend="stdlib")))
+
+    baseline_time, baseline = bench(candidates[0][1], docs, args.repeat)
+    print(f"{'extractor':<30}{'ms/page':>10}{'speedup':>10}{'same text':>11}")
+    for name, fn in candidates:
+        elapsed, outputs = bench(fn, docs, args.repeat) if name != candidates[0][0] else (baseline_time, baseline)
+        same = sum(a == b for a, b in zip(outputs, baseline))
+        print(f"{name:<30}{elapsed * 1000 / len(docs):>10.2f}{baseline_time / elapsed:>9.1f}x{same:>7}/{len(docs)}")
+
+    # The streaming backends must agree with each other on every page, including ones
+    # that omit optional end tags inside skipped subtrees
+    if etree is not None:
+        print()
+        mismatches = 0
+        for name, html in docs:
+            fast, fallback = extract_text(html, args.max_chars, backend="lxml"), extract_text(html, args.max_chars, backend="stdlib")
+            if fast != fallback:
+                mismatches += 1
+                print(f"backends differ on {name}:\n  lxml:   {fast[:120]!r}\n  stdlib: {fallback[:120]!r}")
+        print(f"lxml and stdlib backends agree on {len(docs) - mismatches}/{len(docs)} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,16 @@ from ai_agent_project.src.tools.registry import ToolRegistry
 from ai_agent_project.src.tools.library.search import WebSearchTool
 from ai_agent_project.src.tools.library.filesystem import FileWriteTool, FileReadTool
 from ai_agent_project.src.memory.working import WorkingMemory
-from ai_agent_project.src.memory.semantic import SemanticMemory
+from ai_agent_project.src.memory.semantic import get_semantic_memory
 from ai_agent_project.src.core.agent import Agent
 from ai_agent_project.src.core.types import AgentResult
 
 from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.http import get_transport, get_async_transport
+from ai_agent_project.src.core.llm_cache import get_llm_cache
+from ai_agent_project.src.core.llm_metrics import get_prefill_stats
+from ai_agent_project.src.utils.page_cache import get_page_cache
+from ai_agent_project.src.utils.singleflight import single_flight_stats
 
 app = FastAPI(title="AI Agent API")
 
@@ -32,14 +37,14 @@ app.add_middleware(
 )
 
 @app.get("/ask")
-def ask_model(p: str):
+async def ask_model(p: str):
     if not p:
         raise HTTPException(status_code=400, detail="Missing 'p' parameter")
 
     try:
         # Use existing LLMProvider for consistent behavior
         llm = LLMProvider() 
-        response_content = llm.generate(p)
+        response_content = await llm.generate_async(p)
 
         return {
             "model": settings.MODEL_NAME,
@@ -51,6 +56,15 @@ def ask_model(p: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/stats")
+def get_stats():
+    return {"http": get_transport().stats(), "http_async": get_async_transport().stats(),
+            "llm_cache": get_llm_cache().stats(), "semantic_memory": get_semantic_memory().stats(),
+            "prefill": get_prefill_stats().stats(),
+            "page_cache": get_page_cache().stats() if get_page_cache() else {"enabled": False},
+            "single_flight": single_flight_stats()}
+
+
 # --- Event System ---
 class EventStream:
     def __init__(self):
@@ -72,6 +86,53 @@ class EventStream:
                 break
             yield {"event": item["event"], "data": json.dumps(item["data"])}
 
+class TokenCoalescer:
+    """
+    Batches streamed LLM tokens into larger SSE "token" events.
+
+    Subtasks run in parallel, so tokens of several steps interleave; each
+    step_id has its own buffer. The first token of a step is sent immediately
+    (time-to-first-byte); after that, a step's text is flushed once `max_chars`
+    have accumulated or `interval` seconds have passed since its last flush.
+    `flush(step_id)` must be called before any event that closes the step so
+    that no text is left behind.
+    """
+    def __init__(self, emit, interval: float = 0.05, max_chars: int = 64):
+        self.emit = emit
+        self.interval = interval
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._buffers: Dict[Any, List[str]] = {}
+        self._buffered_chars: Dict[Any, int] = {}
+        self._last_flush: Dict[Any, float] = {}
+
+    def add(self, data: Dict[str, Any]):
+        step_id = data["step_id"]
+        with self._lock:
+            buffer = self._buffers.setdefault(step_id, [])
+            buffer.append(data["text"])
+            self._buffered_chars[step_id] = self._buffered_chars.get(step_id, 0) + len(data["text"])
+            # a step seen for the first time has no last flush, so its first token goes out right away
+            if (self._buffered_chars[step_id] >= self.max_chars
+                    or time.monotonic() - self._last_flush.get(step_id, 0.0) >= self.interval):
+                self._flush_locked(step_id)
+
+    def flush(self, step_id=None):
+        """Flushes one step, or every step when `step_id` is None."""
+        with self._lock:
+            for sid in ([step_id] if step_id is not None else list(self._buffers)):
+                self._flush_locked(sid)
+
+    def _flush_locked(self, step_id):
+        buffer = self._buffers.get(step_id)
+        if not buffer:
+            return
+        self.emit({"step_id": step_id, "text": "".join(buffer)})
+        self._buffers[step_id] = []
+        self._buffered_chars[step_id] = 0
+        self._last_flush[step_id] = time.monotonic()
+
+
 class AgentRun:
     def __init__(self, run_id: str, goal: str):
         self.run_id = run_id
@@ -88,7 +149,7 @@ class AgentRun:
         self.registry.register(FileWriteTool())
         self.registry.register(FileReadTool())
         self.memory = WorkingMemory()
-        self.semantic = SemanticMemory()
+        self.semantic = get_semantic_memory()
         
         self.agent = Agent(
             llm=self.llm, 
@@ -121,11 +182,18 @@ class AgentRun:
         
     def execute_with_loop(self, loop):
         self.status = "running"
-        
+
+        tokens = TokenCoalescer(lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "token", "data": d}))
+
+        def on_thought(d):
+            tokens.flush(d.get("step_id"))
+            loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "thought", "data": d})
+
         callbacks = {
             "on_start": lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "start", "data": d}),
             "on_step": lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "step", "data": d}),
-            "on_thought": lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "thought", "data": d}),
+            "on_token": tokens.add,
+            "on_thought": on_thought,
             "on_action": lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "action", "data": d}),
             "on_observation": lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "observation", "data": d}),
             "on_subtask_complete": lambda d: loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "subtask_complete", "data": d}),
@@ -137,6 +205,7 @@ class AgentRun:
             loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "result", "data": {"answer": self.result.answer, "error": self.result.error}})
         except Exception as e:
             self.status = "error"
+            tokens.flush()
             loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "error", "data": str(e)})
         finally:
             loop.call_soon_threadsafe(self.stream.queue.put_nowait, {"event": "DONE", "data": {}})
@@ -12,12 +12,89 @@ class Settings:
     MODEL_NAME = os.getenv("AGENT_MODEL_NAME", "gpt-4-turbo-preview")
     SIDE_MODEL_NAME = os.getenv("SIDE_MODEL_NAME", "gemini-pro")
     MAX_LOOPS = int(os.getenv("MAX_LOOPS", "15"))
+    MAX_PARALLEL_SUBTASKS = int(os.getenv("MAX_PARALLEL_SUBTASKS", "4"))  # independent plan subtasks run at once
+    MAX_PARALLEL_ACTIONS = int(os.getenv("MAX_PARALLEL_ACTIONS", "4"))    # tool calls per step
+    LLM_NATIVE_TOOL_CALLS = os.getenv("LLM_NATIVE_TOOL_CALLS", "false").lower() == "true"  # ollama/openai function calling
+    TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "60"))                 # seconds per tool call, 0 = no limit
+    TOOL_TIMEOUTS = {
+        tool: float(timeout) for tool, timeout in (
+            item.split("=") for item in os.getenv("TOOL_TIMEOUTS", "").split(",") if item
+        )
+    }
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://192.168.1.13:11434")
-    
+    LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")  # how long Ollama keeps the model (and its KV cache) loaded
+
+    # HTTP transport (shared keep-alive connection pools)
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # number of per-host pools kept
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))          # keep-alive sockets per host
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+
+    # Web page fetching for search results
+    WEB_FETCH_PAGES = int(os.getenv("WEB_FETCH_PAGES", "2"))            # result pages whose content is used
+    WEB_FETCH_DEADLINE = float(os.getenv("WEB_FETCH_DEADLINE", "8"))    # seconds for the whole batch
+    WEB_FETCH_WORKERS = int(os.getenv("WEB_FETCH_WORKERS", "4"))
+    WEB_FETCH_MAX_CHARS = int(os.getenv("WEB_FETCH_MAX_CHARS", "2500"))   # text kept per page
+    WEB_FETCH_MAX_BYTES = int(os.getenv("WEB_FETCH_MAX_BYTES", "1048576"))  # body bytes read per page
+
     # Paths
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     MEMORY_PATH = os.path.join(BASE_DIR, "data", "memory")
+    MEMORY_EMBEDDING_DIM = int(os.getenv("MEMORY_EMBEDDING_DIM", "256"))
+    MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", "0.15"))  # cosine floor for a retrieval hit
+    MEMORY_RETRIEVAL_MODE = os.getenv("MEMORY_RETRIEVAL_MODE", "hybrid")  # vector | keyword | hybrid
+    MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "json")  # json (in-memory + log) | mmap (disk-resident)
+    MEMORY_COMPACT_EVERY = int(os.getenv("MEMORY_COMPACT_EVERY", "500"))  # log records before a snapshot
+    MEMORY_LOG_FSYNC = os.getenv("MEMORY_LOG_FSYNC", "true").lower() == "true"
+    MEMORY_DEDUP_ENABLED = os.getenv("MEMORY_DEDUP_ENABLED", "true").lower() == "true"
+    MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.85"))  # MinHash Jaccard estimate
+    MEMORY_MINHASH_PERM = int(os.getenv("MEMORY_MINHASH_PERM", "64"))
+    MEMORY_LSH_BANDS = int(os.getenv("MEMORY_LSH_BANDS", "16"))
+    # Capacity / eviction (0 disables a limit). TTLs count from a document's last sighting.
+    MEMORY_MAX_DOCUMENTS = int(os.getenv("MEMORY_MAX_DOCUMENTS", "50000"))
+    MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+    MEMORY_TTL_BY_SOURCE = {
+        source: float(ttl) for source, ttl in (
+            item.split("=") for item in
+            os.getenv("MEMORY_TTL_BY_SOURCE", "web_search=259200,read_file=2592000").split(",") if item
+        )
+    }
+    MEMORY_DEFAULT_TTL = float(os.getenv("MEMORY_DEFAULT_TTL", "0"))
+    MEMORY_EVICT_HALF_LIFE = float(os.getenv("MEMORY_EVICT_HALF_LIFE", "86400"))  # recency decay
+    MEMORY_EVICT_INTERVAL = float(os.getenv("MEMORY_EVICT_INTERVAL", "60"))
+    # Context window budget (see core/context_budget.py)
+    LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "4096"))     # sent to Ollama as num_ctx
+    LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "512"))  # reserved for the reply
+    TOKENIZER = os.getenv("TOKENIZER", "approx")  # approx | tiktoken[:<encoding>]
+    CONTEXT_BUDGET_SHARES = {
+        section: float(share) for section, share in (
+            item.split("=") for item in
+            os.getenv("CONTEXT_BUDGET_SHARES",
+                      "system=0.1,goal=0.03,task=0.03,tools=0.15,context=0.14,history=0.35,observation=0.2").split(",") if item
+        )
+    }
+
+    # Working memory (step history in the prompt; 0 disables the budget)
+    WORKING_MEMORY_HISTORY_TOKENS = int(os.getenv("WORKING_MEMORY_HISTORY_TOKENS", "1500"))
+    WORKING_MEMORY_KEEP_RECENT = int(os.getenv("WORKING_MEMORY_KEEP_RECENT", "2"))          # steps kept verbatim
+    WORKING_MEMORY_OBSERVATION_CHARS = int(os.getenv("WORKING_MEMORY_OBSERVATION_CHARS", "300"))  # older steps
     SAFETY_CONFIG_PATH = os.path.join(BASE_DIR, "config", "safety_policy.yaml")
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, "data", "cache"))
+
+    # LLM response cache (deterministic requests only)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_responses.sqlite"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))                  # in-memory tier
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))     # SQLite tier
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+    # Fetched page text (shared by every page fetcher, revalidated with conditional GETs)
+    PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+    PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(CACHE_DIR, "pages.sqlite"))
+    PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "3600"))  # freshness when the server sends no max-age
 
     # Guardrails
     BLOCKED_TOOLS = ["system_shell", "delete_root"]
@@ -1,24 +1,89 @@
 import json
 import re
-from typing import Optional, List, Dict, Any
-from ai_agent_project.src.core.types import AgentResult, Thought, Action, ToolOutput, Step
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from ai_agent_project.src.core.types import AgentResult, Thought, Action, ToolOutput, Step, ContextUsage, LLMTimings
+from ai_agent_project.src.core.context_budget import ContextBudget, format_usage
+from ai_agent_project.src.core.prompt_layout import PromptLayout, PromptTemplate
 from ai_agent_project.src.core.llm_provider import LLMProvider
+from ai_agent_project.src.core.stream_parser import StreamingThoughtParser, STOP_SEQUENCES
 from ai_agent_project.src.tools.registry import ToolRegistry
 from ai_agent_project.src.memory.working import WorkingMemory
-from ai_agent_project.src.memory.semantic import SemanticMemory
-from ai_agent_project.src.planning.planner import Planner, TaskStatus
+from ai_agent_project.src.memory.semantic import SemanticMemory, get_semantic_memory
+from ai_agent_project.src.planning.planner import Planner, SubTask
+from ai_agent_project.src.planning.executor import PlanExecutor
 from ai_agent_project.src.safety.guardrails import SafetyGuardrails, SecurityError
 from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.singleflight import get_single_flight
+
+THINK_INSTRUCTIONS = """You are a helpful AI assistant.
+You must complete the current subtask.
+
+FORMAT INSTRUCTIONS:
+1. To use a tool:
+Thought: <reasoning>
+Action: <tool_name>
+Action Input: {<json_args>}
+
+2. To use several tools at once (independent calls, e.g. one search per item being compared),
+repeat the Action / Action Input pair for each call; all of them run in parallel:
+Thought: <reasoning>
+Action: <tool_name>
+Action Input: {<json_args>}
+Action: <tool_name>
+Action Input: {<json_args>}
+
+3. To answer directly (or for chitchat):
+Thought: <reasoning>
+Final Answer: <your response>
+
+Examples:
+Thought: User said hi. I should greet them.
+Final Answer: Hello! How can I help you today?
+
+Thought: I need to search for python documentation.
+Action: web_search
+Action Input: {"query": "python documentation"}
+"""
+_ACTION_LINE = re.compile(r"^[ \t]*action[ \t]*:[ \t]*(.*)$", re.IGNORECASE | re.MULTILINE)
+THINK_PREFIX = PromptTemplate("{system}\nTOOLS:\n{tools}")
+THINK_SESSION = PromptTemplate("GOAL: {goal}\nCONTEXT: {context}")
+THINK_STEP = PromptTemplate("HISTORY:\n{history}\n\nSUBTASK: {task}\nWhat is the next step?\n")
+
+class StepBudget:
+    """Hands out step ids up to `limit`; shared by the subtasks of one run."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._taken = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> Optional[int]:
+        with self._lock:
+            if self._taken >= self.limit:
+                return None
+            self._taken += 1
+            return self._taken
+
+    @property
+    def exhausted(self) -> bool:
+        return self._taken >= self.limit
 
 class Agent:
     def __init__(self, llm: LLMProvider, tools: ToolRegistry, memory: WorkingMemory, semantic_memory: SemanticMemory = None):
         self.llm = llm
         self.tools = tools
         self.working_memory = memory
-        self.semantic_memory = semantic_memory or SemanticMemory()
+        self.semantic_memory = semantic_memory or get_semantic_memory()
         self.planner = Planner(llm)
         self.safety = SafetyGuardrails()
         self.max_loops = settings.MAX_LOOPS
+        self.context_budget = ContextBudget.from_settings()
+        self._layouts: "weakref.WeakKeyDictionary[WorkingMemory, Tuple[int, PromptLayout]]" = weakref.WeakKeyDictionary()
+        self._layout_lock = threading.Lock()
 
     def run(self, goal: str, callbacks: Dict[str, Any] = None) -> AgentResult:
         # 1. Initialization
@@ -35,145 +100,184 @@ class Agent:
         self.working_memory.context["semantic_context"] = context_str
         
         # 3. Create Plan
-        current_plan = self.planner.create_initial_plan(goal)
-        
-        for i in range(self.max_loops):
-            step_id = i + 1
-            
-             # Check if plan is complete
-            # Check if plan is complete
-            if self.planner.plan.is_complete():
-                print("\n✅ Plan Complete!")
-                
-                # Use the result of the last subtask as the final answer
-                final_answer = "All planned tasks completed."
-                if self.planner.plan.subtasks:
-                    last_task = self.planner.plan.subtasks[-1]
-                    if last_task.result:
-                        final_answer = last_task.result
-                        
-                return AgentResult(success=True, answer=final_answer, steps=self.working_memory.steps)
-
-            # Get next active subtask
-            current_task = self.planner.get_next_step()
-            if not current_task:
-                print("⚠️ No active tasks (blocked?).")
-                break
-                
-            print(f"\n--- Step {step_id} (Subtask {current_task.id}: {current_task.description}) ---")
-            self.planner.update_task_status(current_task.id, TaskStatus.IN_PROGRESS)
-            fire_event("on_step", {"step_id": step_id, "subtask_id": current_task.id, "subtask": current_task.description})
+        self.planner.create_initial_plan(goal)
+
+        # 4. Execute: independent subtasks run concurrently, each on its own branch of working memory;
+        # all of them draw step ids from one budget of max_loops.
+        budget = StepBudget(self.max_loops)
+        executor = PlanExecutor(
+            self.planner,
+            lambda task, inputs: self._run_subtask(goal, task, inputs, budget, fire_event),
+            max_parallel=settings.MAX_PARALLEL_SUBTASKS,
+            should_stop=lambda: budget.exhausted,
+        )
+        executor.run()
+
+        if self.planner.is_complete():
+            print("\n✅ Plan Complete!")
+
+            # Use the result of the last subtask as the final answer
+            final_answer = "All planned tasks completed."
+            if self.planner.plan.subtasks:
+                last_task = self.planner.plan.subtasks[-1]
+                if last_task.result:
+                    final_answer = last_task.result
+
+            return AgentResult(success=True, answer=final_answer, steps=self.working_memory.steps)
+
+        return AgentResult(success=False, error="Max loops exceeded", steps=self.working_memory.steps)
+
+    def _run_subtask(self, goal: str, task: SubTask, inputs: Dict[int, Optional[str]], budget: "StepBudget",
+                     fire_event: Callable[[str, Any], None]) -> Tuple[bool, Optional[str]]:
+        """Think/act loop for one subtask until it gives a Final Answer (True, answer) or the step budget runs out."""
+        dependency_results = "\n".join(f"- ({dep}) {result if result is not None else '(failed)'}"
+                                        for dep, result in inputs.items())
+        memory = self.working_memory.branch({"dependency_results": dependency_results})
+
+        while True:
+            step_id = budget.take()
+            if step_id is None:
+                return False, None
+
+            print(f"\n--- Step {step_id} (Subtask {task.id}: {task.description}) ---")
+            fire_event("on_step", {"step_id": step_id, "subtask_id": task.id, "subtask": task.description})
 
-            # 4. Think
-            thought = self._think(goal, current_task.description)
-            current_step = Step(step_id=step_id, thought=thought)
+            # Think (partial tokens are forwarded while the model is still generating)
+            on_token = lambda text, sid=step_id: fire_event("on_token", {"step_id": sid, "text": text})
+            thought, usage, timings = self._think(goal, task.description, memory, on_token=on_token)
+            current_step = Step(step_id=step_id, thought=thought, context_usage=usage, timings=timings)
             print(f"Thought: {thought.text}")
-            fire_event("on_thought", {"thought": thought.text})
-            
+            fire_event("on_thought", {"step_id": step_id, "thought": thought.text})
+
             if thought.is_final_answer:
                 # Agent decided this subtask is done
                 print(f"Subtask Result: {thought.answer}")
-                self.planner.update_task_status(current_task.id, TaskStatus.COMPLETED, result=thought.answer)
-                self.working_memory.add_step(current_step)
-                fire_event("on_subtask_complete", {"subtask_id": current_task.id, "result": thought.answer})
-                continue # Loop back to check next task
+                memory.add_step(current_step)
+                fire_event("on_subtask_complete", {"subtask_id": task.id, "result": thought.answer})
+                return True, thought.answer
 
-            # 5. Act
+            # Act: all actions of the turn run concurrently and are recorded in this one step
             if thought.action_name:
-                action = Action(
-                    tool_name=thought.action_name,
-                    tool_args=thought.action_input or {},
-                    thought=thought.text
-                )
-                current_step.action = action
-                print(f"Action: {action.tool_name}({action.tool_args})")
-                fire_event("on_action", {"tool": action.tool_name, "args": action.tool_args})
-                
-                try:
-                    # SAFETY CHECK
-                    self.safety.validate_action(action)
-                    
-                    # EXECUTE
-                    tool_output = self._act(action.tool_name, action.tool_args)
-                    
-                    # Store success/failure
-                    if tool_output.success:
-                         # Automatically add to semantic memory for successful findings
-                         if action.tool_name == "web_search" or action.tool_name == "read_file":
-                             self.semantic_memory.add(str(tool_output.result), metadata={"source": action.tool_name})
-
-                except SecurityError as se:
-                    tool_output = ToolOutput(success=False, result=None, error=f"SECURITY VIOLATION: {str(se)}")
-                
-                current_step.observation = tool_output
-                status = "Success" if tool_output.success else "Failed"
-                obs_preview = str(tool_output.result) if tool_output.success else tool_output.error
-                print(f"Observation ({status}): {obs_preview[:200]}..." if len(str(obs_preview)) > 200 else f"Observation ({status}): {obs_preview}")
-                fire_event("on_observation", {"success": tool_output.success, "result": str(tool_output.result) if tool_output.success else None, "error": tool_output.error})
+                actions = thought.actions or [Action(tool_name=thought.action_name, tool_args=thought.action_input or {}, thought=thought.text)]
+                allowed, outputs = [], {}
+                for i, action in enumerate(actions):
+                    print(f"Action: {action.tool_name}({action.tool_args})")
+                    fire_event("on_action", {"tool": action.tool_name, "args": action.tool_args})
+                    try:
+                        # SAFETY CHECK
+                        self.safety.validate_action(action)
+                        allowed.append(i)
+                    except SecurityError as se:
+                        outputs[i] = ToolOutput(success=False, result=None, error=f"SECURITY VIOLATION: {str(se)}")
+
+                # EXECUTE
+                if allowed:
+                    for i, tool_output in zip(allowed, self._act_many([actions[i] for i in allowed])):
+                        outputs[i] = tool_output
+
+                for i, action in enumerate(actions):
+                    tool_output = outputs[i]
+                    # Automatically add to semantic memory for successful findings
+                    if tool_output.success and action.tool_name in ("web_search", "read_file"):
+                        self.semantic_memory.add(str(tool_output.result), metadata={"source": action.tool_name})
+
+                    status = "Success" if tool_output.success else "Failed"
+                    obs_preview = str(tool_output.result) if tool_output.success else tool_output.error
+                    print(f"Observation ({status}): {obs_preview[:200]}..." if len(str(obs_preview)) > 200 else f"Observation ({status}): {obs_preview}")
+                    fire_event("on_observation", {"success": tool_output.success, "result": str(tool_output.result) if tool_output.success else None, "error": tool_output.error})
+
+                current_step.action = actions[0]
+                current_step.observation = outputs[0]
+                current_step.actions = actions
+                current_step.observations = [outputs[i] for i in range(len(actions))]
                 
             else:
                  current_step.observation = ToolOutput(success=False, error="No tool selected.")
                  print("Agent did not select a tool.")
                  fire_event("on_observation", {"success": False, "error": "No tool selected"})
 
-            # 6. Save Step
-            self.working_memory.add_step(current_step)
+            # Save Step
+            memory.add_step(current_step)
 
-        return AgentResult(success=False, error="Max loops exceeded", steps=self.working_memory.steps)
+    def _think(self, main_goal: str, subtask: str, memory: WorkingMemory,
+               on_token: Optional[Callable[[str], None]] = None) -> Tuple[Thought, ContextUsage, Optional[LLMTimings]]:
+        """One LLM call for the next step of `subtask`, given the history in `memory`."""
+        catalog = self.tools.catalog()  # compiled once per registered tool set
+        context = memory.context.get("semantic_context", "")
+        if memory.context.get("dependency_results"):
+            context += f"\nRESULTS OF EARLIER SUBTASKS:\n{memory.context['dependency_results']}"
 
-    def _think(self, main_goal: str, subtask: str) -> Thought:
-        history = self.working_memory.get_history()
-        # Simplify tool desc for tinyllama
-        tools_simple = []
-        for name, tool in self.tools._tools.items():
-            db = tool.to_dict()
-            # Create a signature-like string
-            # e.g. "web_search(query: str, max_results: int) - Search the internet"
-            params = db['parameters']['properties']
-            args = ", ".join([f"{k}" for k in params.keys()])
-            tools_simple.append(f"{name}({args}): {db.get('descripion', db.get('description', ''))}")
-        
-        tools_desc = "\n".join(tools_simple)
-        
-        semantic_context = self.working_memory.context.get("semantic_context", "")
-        
-        system_prompt = """You are a helpful AI assistant.
-You must complete the current subtask.
-
-FORMAT INSTRUCTIONS:
-1. To use a tool:
-Thought: <reasoning>
-Action: <tool_name>
-Action Input: {<json_args>}
+        # Every section is held to its share of the context window; the history compacts
+        # older steps itself and the latest step is budgeted as the observation.
+        sections, usage = self.context_budget.fit({
+            "system": THINK_INSTRUCTIONS,
+            "goal": main_goal,
+            "task": subtask,
+            "context": context,
+            "tools": catalog.prompt_text,
+            "history": lambda budget: memory.get_history(max_tokens=budget, exclude_last=True),
+            "observation": memory.render_last_step(),
+        })
+        print(f"[Context] {format_usage(usage)}")
+        history = "\n".join(part for part in (sections["history"], sections["observation"]) if part)
 
-2. To answer directly (or for chitchat):
-Thought: <reasoning>
-Final Answer: <your response>
-
-Examples:
-Thought: User said hi. I should greet them.
-Final Answer: Hello! How can I help you today?
-
-Thought: I need to search for python documentation.
-Action: web_search
-Action Input: {"query": "python documentation"}
-"""
-
-        user_prompt = f"""GOAL: {main_goal}
-SUBTASK: {subtask}
-CONTEXT: {semantic_context}
+        # Most stable first, so consecutive steps share the longest possible prompt prefix:
+        # instructions + tools (fixed), then goal + context (fixed for the run), then history
+        # (append-only) and the subtask, which change every step.
+        layout = self._layout_for(memory, catalog.version, lambda: THINK_PREFIX.fill(system=sections["system"], tools=sections["tools"]))
+        system_prompt, user_prompt = layout.build(
+            session=THINK_SESSION.fill(goal=sections["goal"], context=sections["context"]),
+            step=THINK_STEP.fill(history=history, task=sections["task"]),
+        )
+        if settings.LLM_NATIVE_TOOL_CALLS:
+            # The backend returns structured (possibly parallel) tool calls instead of text to parse
+            response = self.llm.generate_with_tools(user_prompt, system_prompt=system_prompt, tools=catalog.to_tool_calls())
+            if "action:" not in response.lower() and "final answer:" not in response.lower():
+                response = f"Final Answer: {response}"  # no tool call means the model answered
+            if on_token and response:
+                on_token(response)
+        else:
+            response = self._stream_thought(user_prompt, system_prompt, on_token)
+        timings = self.llm.last_timings
+        if timings is not None:
+            timings.shared_prefix_tokens = layout.shared_prefix_tokens
+            if timings.prompt_eval_ms is not None:
+                print(f"[LLM] Prefill: {timings.prompt_eval_tokens} tokens in {timings.prompt_eval_ms:.0f} ms "
+                      f"({layout.shared_prefix_tokens} leading tokens unchanged since the last step)")
+        print(f"\n[DEBUG] Raw LLM Response:\n{response}\n[END DEBUG]\n") # Debug for user
+        return self._parse_thought(response), usage, timings
 
-TOOLS:
-{tools_desc}
+    def _stream_thought(self, user_prompt: str, system_prompt: str,
+                        on_token: Optional[Callable[[str], None]]) -> str:
+        # Stream and stop as soon as a complete Action (+ JSON input) or Final Answer is parsed,
+        # instead of paying for a hallucinated Observation and extra turns.
+        parser = StreamingThoughtParser(max_actions=settings.MAX_PARALLEL_ACTIONS)
+        forwarded = 0
+        stream = self.llm.generate_stream(user_prompt, system_prompt=system_prompt, stop=STOP_SEQUENCES)
+        try:
+            for chunk in stream:
+                done = parser.feed(chunk)
+                if on_token:
+                    text = parser.text
+                    if len(text) > forwarded:
+                        on_token(text[forwarded:])
+                        forwarded = len(text)
+                if done:
+                    print("[Agent] Complete step parsed, stopping generation early.")
+                    break
+        finally:
+            stream.close()  # closes the HTTP stream so the backend stops decoding
+        return parser.text
 
-HISTORY:
-{history}
+    def _layout_for(self, memory: WorkingMemory, version: int, prefix: Callable[[], str]) -> PromptLayout:
+        """One layout per memory branch, so concurrent subtasks each keep their own prompt prefix."""
+        with self._layout_lock:
+            entry = self._layouts.get(memory)
+            if entry is None or entry[0] != version:
+                entry = (version, PromptLayout(prefix()))
+                self._layouts[memory] = entry
+            return entry[1]
 
-What is the next step?
-"""
-        response = self.llm.generate(user_prompt, system_prompt=system_prompt)
-        print(f"\n[DEBUG] Raw LLM Response:\n{response}\n[END DEBUG]\n") # Debug for user
-        return self._parse_thought(response)
 
     def _parse_thought(self, llm_response: str) -> Thought:
         # Relaxed parsing
@@ -238,7 +342,10 @@ What is the next step?
                                     except:
                                         pass
                  
-                 return Thought(text=thought_part, action_name=tool_name, action_input=action_input)
+                 # Further Action / Action Input pairs in the same response run alongside the first
+                 actions = [Action(tool_name=tool_name, tool_args=action_input, thought=thought_part)]
+                 actions += self._parse_actions(llm_response[idx:], thought_part)[1:settings.MAX_PARALLEL_ACTIONS]
+                 return Thought(text=thought_part, action_name=tool_name, action_input=action_input, actions=actions)
              
              # Fallback: Just thought
              return Thought(text=llm_response.replace("Thought:", "").strip())
@@ -247,6 +354,58 @@ What is the next step?
             print(f"[Parse Error] {e}")
             return Thought(text=llm_response, is_final_answer=False)
 
+    def _parse_actions(self, text: str, thought: str) -> List[Action]:
+        """Every `Action:` line in `text` with the JSON object of its `Action Input:`."""
+        matches = list(_ACTION_LINE.finditer(text))
+        actions = []
+        for i, match in enumerate(matches):
+            block = text[match.end():matches[i + 1].start() if i + 1 < len(matches) else len(text)]
+            tool_name = match.group(1).strip().split(" ")[0].split("(")[0].strip()
+            tool_args = {}
+            json_match = re.search(r"\{.*\}", block, re.DOTALL)
+            if json_match:
+                for candidate in (json_match.group(0), json_match.group(0).replace("'", '"')):
+                    try:
+                        tool_args = json.loads(candidate)
+                        break
+                    except ValueError:
+                        pass
+            actions.append(Action(tool_name=tool_name, tool_args=tool_args, thought=thought))
+        return actions
+
+    def _act_many(self, actions: List[Action]) -> List[ToolOutput]:
+        """
+        Runs the actions concurrently, each bounded by its tool's timeout.
+        A tool still running at its deadline is reported as failed and left to finish in the background.
+        """
+        if len(actions) == 1 and self._timeout_for(actions[0].tool_name) <= 0:
+            return [self._act(actions[0].tool_name, actions[0].tool_args)]
+        pool = ThreadPoolExecutor(max_workers=len(actions), thread_name_prefix="tool")
+        try:
+            started = time.monotonic()
+            futures = [pool.submit(self._act, a.tool_name, a.tool_args) for a in actions]
+            outputs = []
+            for action, future in zip(actions, futures):
+                timeout = self._timeout_for(action.tool_name)
+                try:
+                    remaining = max(started + timeout - time.monotonic(), 0) if timeout > 0 else None
+                    outputs.append(future.result(timeout=remaining))
+                except FutureTimeout:
+                    future.cancel()
+                    print(f"⚠️ Tool {action.tool_name} timed out after {timeout:g}s.")
+                    outputs.append(ToolOutput(success=False, error=f"Timed out after {timeout:g}s"))
+            return outputs
+        finally:
+            pool.shutdown(wait=False)
+
+    def _timeout_for(self, tool_name: str) -> float:
+        """Per-tool override from settings, else the tool's own `timeout`, else the default (0 = none)."""
+        if tool_name in settings.TOOL_TIMEOUTS:
+            return settings.TOOL_TIMEOUTS[tool_name]
+        tool = self.tools.get(tool_name)
+        timeout = getattr(tool, "timeout", None) if tool else None
+        return settings.TOOL_TIMEOUT if timeout is None else timeout
+
     def _act(self, tool_name: str, tool_input: Dict) -> ToolOutput:
         tool = self.tools.get(tool_name)
         if not tool:
@@ -254,8 +413,15 @@ What is the next step?
         try:
             if hasattr(tool, 'input_schema') and tool.input_schema:
                  validated_input = tool.input_schema(**tool_input)
-                 return tool.execute(validated_input)
+                 run = lambda: tool.execute(validated_input)
+                 args = validated_input.model_dump()
             else:
-                 return tool.execute(tool_input)
+                 run = lambda: tool.execute(tool_input)
+                 args = tool_input
+            if not tool.idempotent:
+                return run()
+            # identical calls already running (parallel subtasks or actions) share one execution
+            key = json.dumps({"tool": tool_name, "args": args}, sort_keys=True, default=str)
+            return get_single_flight(f"tool:{tool_name}").do(key, run)[0]
         except Exception as e:
             return ToolOutput(success=False, result=None, error=f"Execution failed: {str(e)}")
@@ -0,0 +1,122 @@
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+from ai_agent_project.src.core.types import ContextUsage
+from ai_agent_project.src.utils.tokens import Tokenizer, get_tokenizer
+from ai_agent_project.src.config.settings import settings
+
+# Sections that can be cut, and which end of each is kept when it is
+TRIM_KEEP = {
+    "system": "head",
+    "goal": "head",
+    "task": "head",
+    "tools": "head",
+    "context": "head",
+    "history": "tail",
+    "observation": "head",
+}
+# Order in which over-budget sections may claim tokens other sections left unused
+PRIORITY = ("system", "goal", "task", "observation", "history", "tools", "context")
+# Sections that only ever get their own share, so their text depends on nothing but their
+# content and stays byte-identical from step to step (keeps the prompt prefix cacheable)
+STABLE = ("system", "goal", "tools", "context")
+
+Section = Union[str, Callable[[int], str]]
+
+
+class ContextBudget:
+    """
+    Splits the model's context window between prompt sections.
+
+    `window - reserve_output - overhead` tokens are shared out by `shares`.
+    A section under its share gives the rest to a common pool. Over-budget
+    sections then draw from the pool in PRIORITY order, and whatever still
+    does not fit is cut by the tokenizer. `stable` sections never draw from
+    the pool. A section can also be a callable
+    that renders itself for a given budget, e.g. WorkingMemory.get_history,
+    which compacts old steps instead of cutting them. The same inputs always
+    give the same prompt.
+    """
+
+    def __init__(self, window: int, reserve_output: int, shares: Dict[str, float],
+                 tokenizer: Optional[Tokenizer] = None, overhead: int = 32,
+                 keep: Optional[Dict[str, str]] = None, stable: Iterable[str] = STABLE):
+        self.window = window
+        self.reserve_output = reserve_output
+        self.overhead = overhead
+        total = sum(shares.values()) or 1.0
+        self.shares = {name: share / total for name, share in shares.items()}
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.keep = {**TRIM_KEEP, **(keep or {})}
+        self.stable = frozenset(stable)
+        self._stable_counts: Dict[str, Tuple[str, int]] = {}  # stable sections rarely change; skip re-tokenizing
+
+    @classmethod
+    def from_settings(cls) -> "ContextBudget":
+        return cls(
+            window=settings.LLM_CONTEXT_WINDOW,
+            reserve_output=settings.LLM_MAX_OUTPUT_TOKENS,
+            shares=settings.CONTEXT_BUDGET_SHARES,
+        )
+
+    @property
+    def available(self) -> int:
+        return max(self.window - self.reserve_output - self.overhead, 0)
+
+    def budgets(self) -> Dict[str, int]:
+        return {name: int(share * self.available) for name, share in self.shares.items()}
+
+    def _count(self, name: str, text: str) -> int:
+        if name not in self.stable:
+            return self.tokenizer.count(text)
+        cached = self._stable_counts.get(name)
+        if cached is None or cached[0] != text:
+            cached = (text, self.tokenizer.count(text))
+            self._stable_counts[name] = cached
+        return cached[1]
+
+    def fit(self, sections: Dict[str, Section]) -> Tuple[Dict[str, str], ContextUsage]:
+        """Returns the sections trimmed to their budgets and the token accounting for them."""
+        base = self.budgets()
+        counts = {name: self._count(name, value) for name, value in sections.items() if isinstance(value, str)}
+        pool = sum(budget for name, budget in base.items() if name not in sections)
+        pool += sum(max(base.get(name, 0) - n, 0) for name, n in counts.items())
+
+        fitted: Dict[str, str] = {}
+        usage = ContextUsage(tokenizer=self.tokenizer.name, window=self.window)
+        order = [name for name in PRIORITY if name in sections] + [name for name in sections if name not in PRIORITY]
+        for name in order:
+            value = sections[name]
+            share = base.get(name, 0)
+            if isinstance(value, str) and counts[name] <= share:
+                fitted[name] = value
+                usage.budgets[name] = share
+                usage.tokens[name] = counts[name]
+                continue
+            allowance = share if name in self.stable else share + pool
+            if isinstance(value, str):
+                text = self.tokenizer.truncate(value, allowance, keep=self.keep.get(name, "head"))
+            else:
+                text = value(allowance)
+                if self.tokenizer.count(text) > allowance:
+                    text = self.tokenizer.truncate(text, allowance, keep=self.keep.get(name, "head"))
+            used = self.tokenizer.count(text)
+            if name not in self.stable:
+                pool = max(allowance - used, 0)
+            fitted[name] = text
+            usage.budgets[name] = allowance
+            usage.tokens[name] = used
+            if isinstance(value, str) and used < counts[name]:
+                usage.trimmed[name] = counts[name] - used
+
+        fitted = {name: fitted[name] for name in sections}
+        return fitted, usage
+
+
+def format_usage(usage: ContextUsage) -> str:
+    """One-line summary for logs, e.g. `1830/4096 tokens (system=210 tools=180 history=900 cut 412)`."""
+    parts = []
+    for name, used in usage.tokens.items():
+        part = f"{name}={used}"
+        if name in usage.trimmed:
+            part += f" cut {usage.trimmed[name]}"
+        parts.append(part)
+    return f"{usage.total}/{usage.window} tokens ({' '.join(parts)})"
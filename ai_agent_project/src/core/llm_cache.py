@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.cache import TwoTierCache
+
+
+class LLMResponseCache:
+    """
+    Response cache in front of LLM generation.
+
+    Keys cover everything that can change the output: backend, model, system
+    prompt, prompt and sampling options. Only deterministic requests
+    (temperature 0) are cached; anything sampled must hit the model.
+    """
+
+    def __init__(self, cache: TwoTierCache, enabled: bool = True):
+        self.cache = cache
+        self.enabled = enabled
+
+    @staticmethod
+    def is_deterministic(options: Dict[str, Any]) -> bool:
+        return float(options.get("temperature", 1.0)) == 0.0
+
+    @staticmethod
+    def make_key(backend: str, model: str, system_prompt: str, prompt: str, options: Dict[str, Any]) -> str:
+        raw = json.dumps(
+            {"backend": backend, "model": model, "system": system_prompt, "prompt": prompt, "options": options},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def key_for(self, backend: str, model: str, system_prompt: str, prompt: str, options: Dict[str, Any]) -> Optional[str]:
+        """Returns the cache key, or None when the request must not be cached."""
+        if not self.enabled or not self.is_deterministic(options):
+            return None
+        return self.make_key(backend, model, system_prompt, prompt, options)
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        return self.cache.get(key)
+
+    def put(self, key: Optional[str], response: str):
+        if key is None or not response:
+            return
+        self.cache.set(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self.cache.stats()}
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide response cache configured from settings (LLM_CACHE_*)."""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                tiers = TwoTierCache(
+                    settings.LLM_CACHE_PATH if settings.LLM_CACHE_PERSIST else None,
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                    ttl=settings.LLM_CACHE_TTL,
+                    table="llm_responses",
+                )
+                _llm_cache = LLMResponseCache(tiers, enabled=settings.LLM_CACHE_ENABLED)
+    return _llm_cache
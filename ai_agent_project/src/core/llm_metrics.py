@@ -0,0 +1,82 @@
+import threading
+from typing import Any, Dict, Optional
+from ai_agent_project.src.core.types import LLMTimings
+
+_NS_PER_MS = 1_000_000
+
+
+def timings_from_ollama(data: Dict[str, Any], ttft_ms: Optional[float] = None) -> LLMTimings:
+    """Reads the timing fields Ollama adds to its final response object (durations are in ns)."""
+    return LLMTimings(
+        prompt_eval_tokens=data.get("prompt_eval_count"),
+        prompt_eval_ms=data["prompt_eval_duration"] / _NS_PER_MS if "prompt_eval_duration" in data else None,
+        eval_tokens=data.get("eval_count"),
+        eval_ms=data["eval_duration"] / _NS_PER_MS if "eval_duration" in data else None,
+        load_ms=data["load_duration"] / _NS_PER_MS if "load_duration" in data else None,
+        ttft_ms=ttft_ms,
+    )
+
+
+class PrefillStats:
+    """
+    Process-wide prefill counters.
+
+    Server side: tokens Ollama actually evaluated for prompts and the time it
+    took (prompt_eval_count / prompt_eval_duration; a KV-cache hit shrinks both),
+    plus client-measured time to first token for streams that stop before the
+    final stats chunk. Client side: prompt sizes and how many leading tokens
+    repeated the previous prompt (see PromptLayout).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_eval_tokens = 0
+        self.prompt_eval_ms = 0.0
+        self.ttft_calls = 0
+        self.ttft_ms = 0.0
+        self.prompts = 0
+        self.prompt_tokens = 0
+        self.shared_prefix_tokens = 0
+
+    def record(self, timings: LLMTimings):
+        with self._lock:
+            if timings.prompt_eval_ms is not None:
+                self.calls += 1
+                self.prompt_eval_tokens += timings.prompt_eval_tokens or 0
+                self.prompt_eval_ms += timings.prompt_eval_ms
+            if timings.ttft_ms is not None:
+                self.ttft_calls += 1
+                self.ttft_ms += timings.ttft_ms
+
+    def record_prompt(self, tokens: int, shared_prefix_tokens: int):
+        with self._lock:
+            self.prompts += 1
+            self.prompt_tokens += tokens
+            self.shared_prefix_tokens += shared_prefix_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_eval_tokens": self.prompt_eval_tokens,
+                "avg_prompt_eval_ms": round(self.prompt_eval_ms / self.calls, 2) if self.calls else 0.0,
+                "avg_ttft_ms": round(self.ttft_ms / self.ttft_calls, 2) if self.ttft_calls else 0.0,
+                "prompts": self.prompts,
+                "prompt_tokens": self.prompt_tokens,
+                "shared_prefix_tokens": self.shared_prefix_tokens,
+                "prefix_reuse_ratio": round(self.shared_prefix_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            }
+
+
+_prefill_stats: Optional[PrefillStats] = None
+_prefill_stats_lock = threading.Lock()
+
+
+def get_prefill_stats() -> PrefillStats:
+    global _prefill_stats
+    if _prefill_stats is None:
+        with _prefill_stats_lock:
+            if _prefill_stats is None:
+                _prefill_stats = PrefillStats()
+    return _prefill_stats
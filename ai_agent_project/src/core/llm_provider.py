@@ -1,19 +1,43 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 import json
 import os
 import time
-import requests
-from openai import OpenAI
+import asyncio
+import threading
+from functools import lru_cache
+from openai import OpenAI, AsyncOpenAI
 import google.genai as genai
 from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.http import get_transport, get_async_transport
+from ai_agent_project.src.core.llm_cache import get_llm_cache
+from ai_agent_project.src.utils.singleflight import get_single_flight
+from ai_agent_project.src.core.llm_metrics import get_prefill_stats, timings_from_ollama
+from ai_agent_project.src.core.types import LLMTimings
+
+@lru_cache(maxsize=None)
+def _shared_openai_client(api_key: str) -> OpenAI:
+    """One OpenAI client per key, so its internal connection pool survives across LLMProvider instances."""
+    return OpenAI(api_key=api_key)
+
+@lru_cache(maxsize=None)
+def _shared_async_openai_client(api_key: str) -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=api_key)
 
 class LLMProvider:
-    """Wrapper for LLM API"""
+    """
+    Wrapper for LLM API.
+
+    `last_timings` holds the prefill/decode timings of the calling thread's
+    latest call (server-reported for Ollama, time to first token for streams).
+    """
     
     def __init__(self):
         # Determine mode based on configuration
         self.mode = "mock"
         self.provider = "none"
+        self.cache = get_llm_cache()
+        self.flight = get_single_flight("llm")
+        self._local = threading.local()
         
         # Check explicit overrides or keys
         # Check explicit overrides or keys
@@ -35,58 +59,321 @@ class LLMProvider:
         
         elif settings.OPENAI_API_KEY:
             print("API Key found. Running in API mode. API Key: ", settings.OPENAI_API_KEY)
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.client = _shared_openai_client(settings.OPENAI_API_KEY)
+            self.async_client = _shared_async_openai_client(settings.OPENAI_API_KEY)
             self.mode = "api"
             self.provider = "openai"
         else:
             print("⚠️ WARNING: No API Key found. Running in MOCK mode.")
 
-    def generate(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.") -> str:
+    def _ollama_payload(self, prompt: str, system_prompt: str, stream: bool = False, stop: Optional[List[str]] = None) -> Dict[str, Any]:
+        payload = {
+            "model": settings.MODEL_NAME,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "stream": stream,
+            "keep_alive": settings.LLM_KEEP_ALIVE,
+            "options": {
+                "temperature": 0.0,
+                "num_ctx": settings.LLM_CONTEXT_WINDOW,
+                "num_predict": settings.LLM_MAX_OUTPUT_TOKENS
+            }
+        }
+        if stop:
+            payload["options"]["stop"] = stop
+        return payload
+
+    @property
+    def last_timings(self) -> Optional[LLMTimings]:
+        return getattr(self._local, "timings", None)
+
+    @last_timings.setter
+    def last_timings(self, timings: Optional[LLMTimings]):
+        self._local.timings = timings
+
+    def _record_timings(self, timings: Optional[LLMTimings]):
+        self.last_timings = timings
+        if timings is not None and not timings.cached:
+            get_prefill_stats().record(timings)
+
+    def _gemini_config(self, stop: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        # Gemini accepts at most 5 stop sequences
+        return {"stop_sequences": stop[:5]} if stop else None
+
+    @staticmethod
+    def _options(stop: Optional[List[str]]) -> Dict[str, Any]:
+        return {"temperature": 0.0, "stop": stop or [], "num_ctx": settings.LLM_CONTEXT_WINDOW,
+                "num_predict": settings.LLM_MAX_OUTPUT_TOKENS}
+
+    def _cache_key(self, prompt: str, system_prompt: str, stop: Optional[List[str]]) -> Optional[str]:
+        return self.cache.key_for(self.provider, settings.MODEL_NAME, system_prompt, prompt, self._options(stop))
+
+    def _request_key(self, prompt: str, system_prompt: str, stop: Optional[List[str]]) -> str:
+        """Identical requests in flight at the same time share one backend call, even with the cache off."""
+        return self.cache.make_key(self.provider, settings.MODEL_NAME, system_prompt, prompt, self._options(stop))
+
+    def generate(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", stop: Optional[List[str]] = None) -> str:
+        self.last_timings = None
         if self.mode == "mock":
             return self._mock_generate(prompt)
-        
+
+        key = self._cache_key(prompt, system_prompt, stop)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.last_timings = LLMTimings(cached=True)
+            return cached
+
+        def call() -> str:
+            response = self._call_api(prompt, system_prompt, stop)
+            self.cache.put(key, response)
+            return response
+
         try:
-            if self.provider == "ollama":
-                payload = {
-                    "model": settings.MODEL_NAME,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.0
-                    }
-                }
-                response = requests.post(f"{self.base_url}/api/chat", json=payload)
-                response.raise_for_status()
-                return response.json()["message"]["content"]
+            response, shared = self.flight.do(self._request_key(prompt, system_prompt, stop), call)
+        except Exception as e:
+            print(f"⚠️ API Call Failed ({str(e)}). Falling back to MOCK response.")
+            return self._mock_generate(prompt)
 
-            elif self.provider == "gemini":
-                # Gemini doesn't strictly separate system prompt in the same way for basic calls, 
-                # but we can prepend it.
-                full_prompt = f"{system_prompt}\n\n{prompt}"
-                response = self.gemini_model.generate_content(full_prompt)
-                return response.text
+        if shared:
+            self.last_timings = LLMTimings(cached=True)  # answered by another caller's request
+        return response
 
-            elif self.provider == "openai":
+    def _call_api(self, prompt: str, system_prompt: str, stop: Optional[List[str]]) -> str:
+        if self.provider == "ollama":
+            payload = self._ollama_payload(prompt, system_prompt, stop=stop)
+            response = get_transport().post(f"{self.base_url}/api/chat", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            self._record_timings(timings_from_ollama(data))
+            return data["message"]["content"]
+
+        elif self.provider == "gemini":
+            # Gemini doesn't strictly separate system prompt in the same way for basic calls, 
+            # but we can prepend it.
+            full_prompt = f"{system_prompt}\n\n{prompt}"
+            response = self.gemini_model.generate_content(full_prompt, generation_config=self._gemini_config(stop))
+            return response.text
+
+        elif self.provider == "openai":
+            response = self.client.chat.completions.create(
+                model=settings.MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.0,
+                stop=stop[:4] if stop else None  # OpenAI allows up to 4
+            )
+            return response.choices[0].message.content
+
+        raise ValueError(f"Unknown provider: {self.provider}")
+
+    def generate_with_tools(self, prompt: str, system_prompt: str, tools: List[Dict[str, Any]]) -> str:
+        """
+        Native function calling (ollama / openai): the model may return several tool calls in one turn.
+        They are rendered as `Action:` / `Action Input:` lines after the model's text, so callers parse
+        one format either way. Other providers fall back to `generate`.
+        """
+        if self.mode == "mock" or self.provider not in ("ollama", "openai") or not tools:
+            return self.generate(prompt, system_prompt=system_prompt)
+        self.last_timings = None
+
+        key = self.cache.key_for(self.provider, settings.MODEL_NAME, system_prompt, prompt,
+                                 {"temperature": 0.0, "tools": tools, "num_ctx": settings.LLM_CONTEXT_WINDOW,
+                                  "num_predict": settings.LLM_MAX_OUTPUT_TOKENS})
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.last_timings = LLMTimings(cached=True)
+            return cached
+
+        try:
+            if self.provider == "ollama":
+                payload = self._ollama_payload(prompt, system_prompt)
+                payload["tools"] = tools
+                response = get_transport().post(f"{self.base_url}/api/chat", json=payload)
+                response.raise_for_status()
+                data = response.json()
+                self._record_timings(timings_from_ollama(data))
+                message = data["message"]
+                text = message.get("content") or ""
+                calls = [(c["function"]["name"], c["function"].get("arguments") or {}) for c in message.get("tool_calls") or []]
+            else:
                 response = self.client.chat.completions.create(
                     model=settings.MODEL_NAME,
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": prompt}
                     ],
-                    temperature=0.0
+                    temperature=0.0,
+                    tools=tools,
+                    parallel_tool_calls=True
                 )
-                return response.choices[0].message.content
-                
+                message = response.choices[0].message
+                text = message.content or ""
+                calls = [(c.function.name, c.function.arguments) for c in message.tool_calls or []]
         except Exception as e:
+            print(f"⚠️ Tool-call API Failed ({str(e)}). Falling back to text generation.")
+            return self.generate(prompt, system_prompt=system_prompt)
+
+        for name, arguments in calls:
+            if not isinstance(arguments, str):
+                arguments = json.dumps(arguments)
+            text += f"\nAction: {name}\nAction Input: {arguments}"
+        self.cache.put(key, text)
+        return text
+
+    def generate_stream(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", stop: Optional[List[str]] = None) -> Iterator[str]:
+        """
+        Yields the response incrementally as the backend produces it.
+        Closing the generator early closes the underlying HTTP stream.
+        A cached response is yielded as a single chunk; a stream is cached only if it ran to completion.
+        """
+        self.last_timings = None
+        if self.mode == "mock":
+            yield from self._mock_stream(prompt)
+            return
+
+        key = self._cache_key(prompt, system_prompt, stop)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.last_timings = LLMTimings(cached=True)
+            yield cached
+            return
+
+        chunks: List[str] = []
+        try:
+            for text in self._stream_api(prompt, system_prompt, stop):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            if chunks:
+                # Part of the answer already reached the caller; don't splice a mock onto it
+                print(f"⚠️ Stream interrupted ({str(e)}).")
+                return
             print(f"⚠️ API Call Failed ({str(e)}). Falling back to MOCK response.")
-            return self._mock_generate(prompt)
+            yield from self._mock_stream(prompt)
+            return
+
+        self.cache.put(key, "".join(chunks))
+
+    def _stream_api(self, prompt: str, system_prompt: str, stop: Optional[List[str]]) -> Iterator[str]:
+        if self.provider == "ollama":
+            payload = self._ollama_payload(prompt, system_prompt, stream=True, stop=stop)
+            started = time.perf_counter()
+            response = get_transport().post(f"{self.base_url}/api/chat", json=payload, stream=True)
+            ttft_ms, final = None, {}
+            try:
+                response.raise_for_status()
+                # Ollama streams one JSON object per line; the last one carries the timings
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    if chunk.get("done"):
+                        final = chunk
+                    text = chunk.get("message", {}).get("content", "")
+                    if text:
+                        yield text
+                    if chunk.get("done"):
+                        break
+            finally:
+                # also runs when the caller stops early; then only time to first token is known
+                response.close()
+                if ttft_ms is not None:
+                    self._record_timings(timings_from_ollama(final, ttft_ms=ttft_ms))
+
+        elif self.provider == "gemini":
+            full_prompt = f"{system_prompt}\n\n{prompt}"
+            for chunk in self.gemini_model.generate_content(full_prompt, stream=True, generation_config=self._gemini_config(stop)):
+                if chunk.text:
+                    yield chunk.text
+
+        elif self.provider == "openai":
+            stream = self.client.chat.completions.create(
+                model=settings.MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.0,
+                stop=stop[:4] if stop else None,
+                stream=True
+            )
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                stream.close()
+
+    async def generate_async(self, prompt: str, system_prompt: str = "You are a helpful AI assistant.", stop: Optional[List[str]] = None) -> str:
+        """Native asyncio variant of generate for use inside an event loop."""
+        self.last_timings = None
+        if self.mode == "mock":
+            await asyncio.sleep(1)
+            return self._mock_generate(prompt, delay=False)
+
+        key = self._cache_key(prompt, system_prompt, stop)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.last_timings = LLMTimings(cached=True)
+            return cached
+
+        async def call() -> str:
+            response = await self._call_api_async(prompt, system_prompt, stop)
+            self.cache.put(key, response)
+            return response
+
+        try:
+            response, shared = await self.flight.do_async(self._request_key(prompt, system_prompt, stop), call)
+        except Exception as e:
+            print(f"⚠️ API Call Failed ({str(e)}). Falling back to MOCK response.")
+            return self._mock_generate(prompt, delay=False)
+
+        if shared:
+            self.last_timings = LLMTimings(cached=True)
+        return response
+
+    async def _call_api_async(self, prompt: str, system_prompt: str, stop: Optional[List[str]]) -> str:
+        if self.provider == "ollama":
+            payload = self._ollama_payload(prompt, system_prompt, stop=stop)
+            response = await get_async_transport().post(f"{self.base_url}/api/chat", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            self._record_timings(timings_from_ollama(data))
+            return data["message"]["content"]
+
+        elif self.provider == "gemini":
+            # The Gemini SDK call is blocking; keep it off the event loop
+            return await asyncio.to_thread(self._call_api, prompt, system_prompt, stop)
+
+        elif self.provider == "openai":
+            response = await self.async_client.chat.completions.create(
+                model=settings.MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.0,
+                stop=stop[:4] if stop else None
+            )
+            return response.choices[0].message.content
+
+        raise ValueError(f"Unknown provider: {self.provider}")
+
+    def _mock_stream(self, prompt: str) -> Iterator[str]:
+        """Chunk the mock response word by word to exercise streaming consumers."""
+        for word in self._mock_generate(prompt).split(" "):
+            yield word + " "
 
-    def _mock_generate(self, prompt: str) -> str:
+    def _mock_generate(self, prompt: str, delay: bool = True) -> str:
         """Simulate agent behavior for demo purposes"""
-        time.sleep(1) # Simulate thinking
+        if delay:
+            time.sleep(1) # Simulate thinking
         
         # simple heuristic based on history in prompt
         if "Action: web_search" not in prompt:
@@ -0,0 +1,57 @@
+import os
+import string
+from typing import List, Optional, Tuple
+from ai_agent_project.src.core.llm_metrics import get_prefill_stats
+from ai_agent_project.src.utils.tokens import Tokenizer, get_tokenizer
+
+
+class PromptTemplate:
+    """
+    A `{field}` template parsed once into literal chunks and field names, so
+    filling it per step is a single join. Missing fields fail at fill time with
+    the template's field list in the error.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+        self.fields = tuple(field for _, field in self._parts if field is not None)
+
+    def fill(self, **values) -> str:
+        try:
+            return "".join(literal + (str(values[field]) if field is not None else "")
+                           for literal, field in self._parts)
+        except KeyError as e:
+            raise KeyError(f"Template needs {self.fields}, missing {e}") from None
+
+
+class PromptLayout:
+    """
+    Builds prompts in layers, ordered from most to least stable:
+      1. prefix  - never changes (instructions, format, tool catalogue); sent as the system message
+      2. session - fixed for one run (goal, retrieved context)
+      3. step    - changes every call (history, current subtask)
+
+    An inference server with a prompt/KV cache (Ollama keeps the previous
+    prompt's state per loaded model) only has to prefill what follows the
+    longest prefix shared with the last prompt, so anything volatile placed
+    early invalidates everything behind it. The layout also measures how much
+    of each prompt repeats the previous one and reports it to the prefill stats.
+    """
+
+    def __init__(self, prefix: str, tokenizer: Optional[Tokenizer] = None):
+        self.prefix = prefix
+        self.tokenizer = tokenizer or get_tokenizer()
+        self._previous: Optional[str] = None
+        self.shared_prefix_tokens = 0
+
+    def build(self, session: str = "", step: str = "") -> Tuple[str, str]:
+        """Returns (system_prompt, user_prompt)."""
+        user_prompt = "\n\n".join(part for part in (session, step) if part)
+        rendered = f"{self.prefix}\n\n{user_prompt}"
+        shared = os.path.commonprefix([self._previous, rendered]) if self._previous else ""
+        self.shared_prefix_tokens = self.tokenizer.count(shared)
+        self._previous = rendered
+        get_prefill_stats().record_prompt(self.tokenizer.count(rendered), self.shared_prefix_tokens)
+        return self.prefix, user_prompt
@@ -0,0 +1,144 @@
+from typing import Optional, List
+
+# Sent to backends that support stop sequences: the model should never write the observation itself.
+STOP_SEQUENCES: List[str] = ["\nObservation:", "\nObservation ("]
+
+# Markers that start a hallucinated next turn after a Final Answer
+_TURN_MARKERS = ("\nobservation", "\nthought:", "\naction:", "\nquestion:")
+_TURN_MARKER_LEN = max(len(m) for m in _TURN_MARKERS)
+
+
+def _lower(chunk: str) -> str:
+    """Lower-cases without changing the length, so offsets into the lowered text stay valid."""
+    lowered = chunk.lower()
+    if len(lowered) == len(chunk):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in chunk)  # e.g. "İ" lowers to 2 chars
+
+
+class StreamingThoughtParser:
+    """
+    Incrementally scans a streamed ReAct response and reports when it is complete.
+
+    A response is complete once either
+      - one or more `Action: <tool>` / `Action Input: {...}` pairs have been seen and the text
+        after the last balanced JSON object is not another `Action:` (or `max_actions` is reached), or
+      - `Final Answer:` has been seen and the model starts a new turn (Observation/Thought/...).
+
+    `text` holds the response cut right after the complete part, so whatever the model
+    would have hallucinated afterwards never reaches `Agent._parse_thought`.
+    """
+
+    def __init__(self, max_actions: int = 1):
+        self.max_actions = max(1, max_actions)
+        self._buffer = ""
+        self._lower = ""                        # `_buffer` lower-cased, extended chunk by chunk
+        self._final_idx = -1                    # first "final answer:" / "action:", once seen
+        self._action_idx = -1
+        self._cut: Optional[int] = None
+        self._actions = 0
+        self._search_from = 0                   # where to look for the current action's input
+        self._action_end: Optional[int] = None  # end of the last complete action, undecided what follows
+        # Cursor state for the JSON object scan (kept across chunks, so each char is scanned once)
+        self._json_start: Optional[int] = None
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self) -> bool:
+        return self._cut is not None
+
+    @property
+    def text(self) -> str:
+        return self._buffer if self._cut is None else self._buffer[:self._cut]
+
+    def feed(self, chunk: str) -> bool:
+        """Adds a chunk. Returns True once the response is complete and generation can stop."""
+        if self.complete:
+            return True
+        start = len(self._buffer)
+        self._buffer += chunk
+        self._lower += _lower(chunk)
+        lower = self._lower
+
+        # Markers are searched only where a new one can be: the chunk plus a marker's length before it
+        if self._final_idx == -1:
+            self._final_idx = lower.find("final answer:", max(0, start - len("final answer:")))
+        if self._action_idx == -1:
+            self._action_idx = lower.find("action:", max(0, start - len("action:")))
+        final_idx, action_idx = self._final_idx, self._action_idx
+
+        if final_idx != -1 and (action_idx == -1 or final_idx < action_idx):
+            body_start = final_idx + len("final answer:")
+            since = max(body_start, start - _TURN_MARKER_LEN)
+            ends = [lower.find(m, since) for m in _TURN_MARKERS]
+            ends = [e for e in ends if e != -1]
+            if ends:
+                self._cut = min(ends)
+            return self.complete
+
+        if action_idx != -1:
+            if not self._actions and self._json_start is None:
+                self._search_from = max(self._search_from, action_idx)
+            while not self.complete:
+                if self._action_end is not None and not self._next_action(lower):
+                    break
+                if self._json_start is None:
+                    input_idx = lower.find("input:", self._search_from)
+                    if input_idx == -1:
+                        self._search_from = max(self._search_from, len(lower) - len("input:"))
+                        break
+                    brace = self._buffer.find("{", input_idx)
+                    if brace == -1:
+                        break
+                    self._json_start = brace
+                    self._scan_pos = brace
+                self._scan_json()
+                if self._action_end is None:
+                    break
+                self._actions += 1
+                if self._actions >= self.max_actions:
+                    self._cut = self._action_end
+
+        return self.complete
+
+    def _next_action(self, lower: str) -> bool:
+        """After a complete action: True if another `Action:` follows, False to wait or stop."""
+        rest = lower[self._action_end:]
+        stripped = rest.lstrip()
+        if len(stripped) < len("action:") and "action:".startswith(stripped):
+            return False  # not enough text yet to tell
+        if not stripped.startswith("action:"):
+            self._cut = self._action_end
+            return False
+        self._search_from = self._action_end + len(rest) - len(stripped) + len("action:")
+        self._action_end = None
+        return True
+
+    def _scan_json(self):
+        buf = self._buffer
+        i = self._scan_pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._action_end = i + 1
+                    self._json_start = None
+                    i += 1
+                    break
+            i += 1
+        self._scan_pos = i
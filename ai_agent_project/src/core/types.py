@@ -11,6 +11,7 @@ class ToolOutput(BaseModel):
     success: bool
     result: Optional[Any] = None
     error: Optional[str] = None
+    metadata: Dict[str, Any] = {}  # tool-specific details (e.g. per-URL fetch timings)
     timestamp: datetime = Field(default_factory=datetime.now)
 
 class Action(BaseModel):
@@ -28,6 +29,30 @@ class Thought(BaseModel):
     answer: Optional[str] = None
     action_name: Optional[str] = None
     action_input: Optional[Dict[str, Any]] = None
+    actions: List[Action] = []  # every action requested this turn (the first is also in action_name/input)
+
+class ContextUsage(BaseModel):
+    """Token accounting for one prompt: per-section budgets, tokens sent and tokens trimmed away."""
+    tokenizer: str
+    window: int
+    budgets: Dict[str, int] = {}
+    tokens: Dict[str, int] = {}
+    trimmed: Dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.tokens.values())
+
+class LLMTimings(BaseModel):
+    """Server-reported timings of one LLM call (Ollama), plus client-measured time to first token."""
+    prompt_eval_tokens: Optional[int] = None  # prompt tokens actually prefilled (cached prefix excluded)
+    prompt_eval_ms: Optional[float] = None
+    eval_tokens: Optional[int] = None
+    eval_ms: Optional[float] = None
+    load_ms: Optional[float] = None
+    ttft_ms: Optional[float] = None
+    shared_prefix_tokens: Optional[int] = None  # leading tokens identical to the previous prompt
+    cached: bool = False  # served from the response cache, no model call
 
 class Step(BaseModel):
     """A single step in the agent's execution history."""
@@ -35,6 +60,11 @@ class Step(BaseModel):
     thought: Thought
     action: Optional[Action] = None
     observation: Optional[ToolOutput] = None
+    # All actions of a multi-action step and their observations, in order; action/observation hold the first
+    actions: List[Action] = []
+    observations: List[ToolOutput] = []
+    context_usage: Optional[ContextUsage] = None
+    timings: Optional[LLMTimings] = None
     timestamp: datetime = Field(default_factory=datetime.now)
 
 class AgentResult(BaseModel):
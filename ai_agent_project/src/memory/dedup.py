@@ -0,0 +1,100 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Mersenne prime for the universal hash family; a * x + b stays below 2**64 for 32-bit x
+_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text with case and whitespace normalized, for exact-duplicate checks."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, plus LSH banding.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the texts' shingle sets. Splitting a signature into `bands`
+    bands gives bucket keys such that near-duplicates very likely share at
+    least one bucket, so candidates are found without comparing every pair.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        n = self.shingle_size
+        grams = {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self._shingles(text)
+        hashed = (shingles[:, None] * self._a + self._b) % _PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, int]]:
+        """(band, bucket) pairs for LSH lookups; stable across processes."""
+        r = self.rows
+        return [(band, zlib.crc32(signature[band * r:(band + 1) * r].tobytes()))
+                for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(a == b))
+
+
+class DedupIndex:
+    """In-memory content-hash map and LSH buckets, keyed by store row."""
+
+    def __init__(self, minhasher: MinHasher):
+        self.minhasher = minhasher
+        self.hashes: Dict[str, int] = {}
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        self.signatures: Dict[int, np.ndarray] = {}
+
+    def add(self, row: int, digest: str, signature: np.ndarray):
+        self.hashes.setdefault(digest, row)
+        self.signatures[row] = signature
+        for key in self.minhasher.band_keys(signature):
+            self.buckets.setdefault(key, []).append(row)
+
+    def remove(self, row: int, digest: str):
+        if self.hashes.get(digest) == row:
+            del self.hashes[digest]
+        signature = self.signatures.pop(row, None)
+        if signature is None:
+            return
+        for key in self.minhasher.band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket and row in bucket:
+                bucket.remove(row)
+                if not bucket:
+                    del self.buckets[key]
+
+    def find(self, digest: str, signature: np.ndarray, threshold: float) -> Optional[Tuple[int, str]]:
+        """Returns (row, "exact" | "near") of a stored duplicate, if any."""
+        row = self.hashes.get(digest)
+        if row is not None:
+            return row, "exact"
+        best, best_score = None, threshold
+        for key in self.minhasher.band_keys(signature):
+            for candidate in self.buckets.get(key, ()):
+                score = self.minhasher.similarity(signature, self.signatures[candidate])
+                if score >= best_score:
+                    best, best_score = candidate, score
+        return (best, "near") if best is not None else None
@@ -0,0 +1,86 @@
+import math
+from typing import Any, Dict, List
+from ai_agent_project.src.config.settings import settings
+
+
+class EvictionPolicy:
+    """
+    Decides which SemanticMemory documents to drop.
+
+    A document expires `ttl` seconds after it was last seen, with the TTL chosen by
+    its `source` (web results go stale faster than files). Beyond that, when the
+    store exceeds `max_documents` or `max_bytes`, the lowest-value documents are
+    evicted until it is back under `low_watermark` of both limits. Value blends:
+      recency   - 2^(-idle / half_life), idle = time since last retrieval or sighting
+      frequency - log(1 + retrievals + repeat sightings)
+      age       - a small per-day penalty since the document was first stored
+    """
+
+    def __init__(self, max_documents: int = 0, max_bytes: int = 0, ttl_by_source: Dict[str, float] = None,
+                 default_ttl: float = 0, half_life: float = 86400, w_recency: float = 1.0,
+                 w_frequency: float = 0.5, w_age: float = 0.05, low_watermark: float = 0.9):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.ttl_by_source = ttl_by_source or {}
+        self.default_ttl = default_ttl
+        self.half_life = half_life
+        self.w_recency = w_recency
+        self.w_frequency = w_frequency
+        self.w_age = w_age
+        self.low_watermark = low_watermark
+
+    @classmethod
+    def from_settings(cls) -> "EvictionPolicy":
+        return cls(
+            max_documents=settings.MEMORY_MAX_DOCUMENTS,
+            max_bytes=settings.MEMORY_MAX_BYTES,
+            ttl_by_source=settings.MEMORY_TTL_BY_SOURCE,
+            default_ttl=settings.MEMORY_DEFAULT_TTL,
+            half_life=settings.MEMORY_EVICT_HALF_LIFE,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_documents or self.max_bytes or self.default_ttl
+                    or any(self.ttl_by_source.values()))
+
+    def ttl(self, source: str) -> float:
+        """Seconds a document from `source` lives after its last sighting; 0 = forever."""
+        return self.ttl_by_source.get(source, self.default_ttl)
+
+    def is_expired(self, usage: Dict[str, Any], now: float) -> bool:
+        ttl = self.ttl(usage["source"])
+        return bool(ttl) and now - usage["last_seen"] > ttl
+
+    def over_capacity(self, documents: int, size: int) -> bool:
+        return bool((self.max_documents and documents > self.max_documents)
+                    or (self.max_bytes and size > self.max_bytes))
+
+    def score(self, usage: Dict[str, Any], now: float) -> float:
+        idle = now - max(usage["last_access"] or 0, usage["last_seen"])
+        recency = 2 ** (-max(idle, 0) / self.half_life)
+        frequency = math.log1p(usage["hits"] + usage["seen_count"] - 1)
+        age_days = (now - usage["first_seen"]) / 86400
+        return self.w_recency * recency + self.w_frequency * frequency - self.w_age * age_days
+
+    def select(self, usages: List[Dict[str, Any]], now: float) -> List[Dict[str, Any]]:
+        """Usage records to evict: every expired one, then the lowest-scoring until under capacity."""
+        victims, live = [], []
+        for usage in usages:
+            (victims if self.is_expired(usage, now) else live).append(usage)
+
+        documents = len(live)
+        size = sum(u["size"] for u in live)
+        if not self.over_capacity(documents, size):
+            return victims
+
+        target_documents = int(self.max_documents * self.low_watermark) if self.max_documents else None
+        target_bytes = int(self.max_bytes * self.low_watermark) if self.max_bytes else None
+        for usage in sorted(live, key=lambda u: self.score(u, now)):
+            if (target_documents is None or documents <= target_documents) and \
+                    (target_bytes is None or size <= target_bytes):
+                break
+            victims.append(usage)
+            documents -= 1
+            size -= usage["size"]
+        return victims
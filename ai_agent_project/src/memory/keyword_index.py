@@ -0,0 +1,73 @@
+import heapq
+import math
+from collections import Counter
+from typing import Dict, List, Tuple, Any
+
+
+class BM25Index:
+    """
+    Inverted index (term -> {row: term frequency}) scored with Okapi BM25.
+
+    Maintained incrementally: `add` touches only the postings of the new
+    document's terms, and `search` only the postings of the query terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, row: int, tokens: List[str]):
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[row] = tf
+        self.doc_lengths[row] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, row: int, tokens: List[str]):
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(row, None)
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(row, 0)
+
+    def search(self, tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        """Returns up to k (row, BM25 score) pairs with a positive score, best first."""
+        n = len(self.doc_lengths)
+        if n == 0 or not tokens:
+            return []
+        avgdl = self.total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for row, tf in posting.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[row] / avgdl)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> Dict[str, Any]:
+        # JSON object keys must be strings, so postings are stored as [row, tf] pairs
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "postings": {term: [[row, tf] for row, tf in posting.items()] for term, posting in self.postings.items()},
+            "doc_lengths": [[row, length] for row, length in self.doc_lengths.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25Index":
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        index.postings = {term: {row: tf for row, tf in pairs} for term, pairs in data["postings"].items()}
+        index.doc_lengths = {row: length for row, length in data["doc_lengths"]}
+        index.total_length = sum(index.doc_lengths.values())
+        return index
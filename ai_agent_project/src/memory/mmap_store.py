@@ -0,0 +1,400 @@
+import heapq
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ai_agent_project.src.utils.embedding import tokenize
+from ai_agent_project.src.memory.dedup import MinHasher
+from ai_agent_project.src.memory.store import Document, DocumentStore, _sighted
+from ai_agent_project.src.memory.vector_index import top_k
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    row INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    text_offset INTEGER NOT NULL,
+    text_length INTEGER NOT NULL,
+    n_tokens INTEGER NOT NULL,
+    metadata TEXT NOT NULL,
+    content_hash TEXT,
+    signature BLOB,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS docs_content_hash ON docs (content_hash);
+CREATE TABLE IF NOT EXISTS lsh (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, row)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, row)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+class MappedStore(DocumentStore):
+    """
+    Disk-resident backend for very large corpora. Opening it is O(1) and resident
+    memory does not grow with the corpus; only the top-k results are materialized.
+
+    - `embeddings.f32`: float32 rows behind a `np.memmap`, preallocated and grown by doubling
+    - `texts.bin`:      UTF-8 document texts, append-only, addressed by (offset, length)
+    - `index.sqlite`:   per-row id / text offset / metadata / MinHash signature / usage,
+                        plus the BM25 postings and LSH buckets
+
+    SQLite is the commit point: the text and vector are written first and the row only
+    exists once its metadata transaction commits, so a crash mid-write leaves at most
+    unreferenced bytes at the end of the data files, which later writes reuse or skip.
+    Deleting a row zeroes its vector and drops its SQLite rows; the text bytes stay in the
+    blob as dead space (capacity is accounted in live bytes).
+
+    Safe to share between threads and processes: every write runs inside a
+    `BEGIN IMMEDIATE` transaction, which also serializes row allocation and blob
+    appends across processes, and counters live in SQLite rather than in the
+    process. Reads use per-thread connections and file handles, so they run
+    concurrently with each other and with writers (WAL).
+    """
+
+    # Rows scored per block during a vector scan; bounds the temporary score buffer
+    SCAN_CHUNK = 65536
+    # Documents removed per delete transaction, so other writers interleave with an eviction pass
+    DELETE_CHUNK = 64
+
+    def __init__(self, directory: str, dim: int, minhasher: MinHasher, fsync: bool = True,
+                 initial_capacity: int = 1024, k1: float = 1.5, b: float = 0.75):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dim = dim
+        self.minhasher = minhasher
+        self.fsync = fsync
+        self.k1 = k1
+        self.b = b
+        self._db_path = os.path.join(directory, "index.sqlite")
+        self._text_path = os.path.join(directory, "texts.bin")
+        self._vectors_path = os.path.join(directory, "embeddings.f32")
+        self._lock = threading.Lock()      # the write connection, blob appends and the map
+        self._local = threading.local()    # per-thread read connection + text handle
+        self._readers = []
+        self._hits = {}  # row -> [retrievals, last_access] not yet written to SQLite
+
+        self._conn = self._connect()
+        with self._transaction():
+            columns = {r[1] for r in self._conn.execute("PRAGMA table_info(docs)")}
+            if columns:
+                # Stores created by older versions; rows without a hash/signature never match as duplicates
+                for column, decl in (("content_hash", "TEXT"), ("signature", "BLOB"),
+                                     ("hits", "INTEGER NOT NULL DEFAULT 0"), ("last_access", "REAL NOT NULL DEFAULT 0")):
+                    if column not in columns:
+                        self._conn.execute(f"ALTER TABLE docs ADD COLUMN {column} {decl}")
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (dim,))
+            self._conn.execute("INSERT OR IGNORE INTO meta SELECT 'sightings', value FROM meta WHERE key = 'doc_count'")
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'bytes'").fetchone() is None:
+                self._conn.execute("INSERT INTO meta SELECT 'bytes', COALESCE(SUM(text_length), 0) FROM docs")
+        counters = self._counters(self._conn)
+        if counters["dim"] != dim:
+            raise ValueError(f"Store at {directory} holds {counters['dim']}-d embeddings, expected {dim}")
+
+        self._text_file = open(self._text_path, "a+b")
+        row_bytes = dim * 4
+        existing = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        capacity = max(existing, initial_capacity, 1)
+        while capacity < counters["next_row"]:
+            capacity *= 2
+        self._vectors = self._map(capacity)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self, conn: Optional[sqlite3.Connection] = None):
+        # IMMEDIATE takes the database write lock up front, so it also orders writers across processes
+        conn = conn or self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _reader(self) -> Tuple[sqlite3.Connection, Any]:
+        local = self._local
+        if getattr(local, "conn", None) is None:
+            local.conn = self._connect()
+            local.text = open(self._text_path, "rb")
+            with self._lock:
+                self._readers.append((local.conn, local.text))
+        return local.conn, local.text
+
+    def _counters(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        # All O(1): counters are maintained in `meta`, MAX(row) is a rowid lookup
+        counters = {"dim": 0, "doc_count": 0, "total_length": 0, "sightings": 0, "bytes": 0, "next_row": 0}
+        counters.update(conn.execute("SELECT key, value FROM meta").fetchall())
+        max_row = conn.execute("SELECT MAX(row) FROM docs").fetchone()[0]
+        counters["next_row"] = max(counters["next_row"], 0 if max_row is None else max_row + 1)
+        return counters
+
+    def _map(self, capacity: int) -> np.memmap:
+        size = capacity * self.dim * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _reserve(self, needed: int):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        # Another process may already have grown the file further
+        capacity = max(capacity, os.path.getsize(self._vectors_path) // (self.dim * 4))
+        while capacity < needed:
+            capacity *= 2
+        self._vectors.flush()
+        # Readers holding the old map keep a valid (smaller) view of the same file
+        self._vectors = self._map(capacity)
+
+    def __len__(self) -> int:
+        return self._counters(self._reader()[0])["doc_count"]
+
+    def add(self, doc: Document, vector: np.ndarray, tokens: List[str], signature: np.ndarray) -> int:
+        data = doc.content.encode("utf-8")
+        counts = Counter(tokens)
+        with self._lock, self._transaction():
+            row = self._counters(self._conn)["next_row"]
+            self._text_file.seek(0, os.SEEK_END)
+            offset = self._text_file.tell()
+            self._text_file.write(data)
+            self._text_file.flush()
+
+            self._reserve(row + 1)
+            self._vectors[row] = vector
+            if self.fsync:
+                os.fsync(self._text_file.fileno())
+                self._vectors.flush()
+
+            self._conn.execute(
+                "INSERT INTO docs (row, id, text_offset, text_length, n_tokens, metadata, content_hash, signature) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (row, doc.id, offset, len(data), len(tokens), json.dumps(doc.metadata, default=str),
+                 doc.metadata["content_hash"], signature.astype(np.uint32).tobytes()),
+            )
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                   [(term, row, tf) for term, tf in counts.items()])
+            self._conn.executemany("INSERT OR IGNORE INTO lsh VALUES (?, ?, ?)",
+                                   [(band, bucket, row) for band, bucket in self.minhasher.band_keys(signature)])
+            self._bump({"doc_count": 1, "total_length": len(tokens), "sightings": 1, "bytes": len(data)})
+            self._conn.execute("INSERT INTO meta VALUES ('next_row', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                               (row + 1,))
+        return row
+
+    def _bump(self, deltas: Dict[str, int], conn: Optional[sqlite3.Connection] = None):
+        (conn or self._conn).executemany(
+            "INSERT INTO meta VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            list(deltas.items()),
+        )
+
+    def find_duplicate(self, digest: str, signature: np.ndarray, threshold: float) -> Optional[Tuple[int, str]]:
+        conn = self._reader()[0]
+        found = conn.execute("SELECT row FROM docs WHERE content_hash = ? LIMIT 1", (digest,)).fetchone()
+        if found:
+            return found[0], "exact"
+        keys = self.minhasher.band_keys(signature)
+        clause = " OR ".join("(l.band = ? AND l.bucket = ?)" for _ in keys)
+        candidates = conn.execute(
+            f"SELECT DISTINCT d.row, d.signature FROM lsh l JOIN docs d ON d.row = l.row WHERE {clause}",
+            [v for key in keys for v in key],
+        ).fetchall()
+        best, best_score = None, threshold
+        for row, blob in candidates:
+            score = self.minhasher.similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= best_score:
+                best, best_score = row, score
+        return (best, "near") if best is not None else None
+
+    def touch(self, row: int) -> Optional[Document]:
+        with self._lock, self._transaction():
+            found = self._conn.execute("SELECT metadata FROM docs WHERE row = ?", (row,)).fetchone()
+            if found is None:
+                return None
+            metadata = _sighted(json.loads(found[0]))
+            self._conn.execute("UPDATE docs SET metadata = ? WHERE row = ?",
+                               (json.dumps(metadata, default=str), row))
+            self._bump({"sightings": 1})
+        docs = self.get([row])
+        return docs[0] if docs else None
+
+    def delete(self, ids: Sequence[str]) -> int:
+        ids = list(ids)
+        deleted = 0
+        # A private write connection: BEGIN IMMEDIATE orders it against every other writer, so
+        # `_lock` (which retrieval also takes) is held only to clear each chunk's vectors
+        conn = self._connect()
+        text = self._reader()[1]
+        try:
+            for start in range(0, len(ids), self.DELETE_CHUNK):
+                chunk = ids[start:start + self.DELETE_CHUNK]
+                rows = []
+                with self._transaction(conn):
+                    deltas = {"doc_count": 0, "total_length": 0, "sightings": 0, "bytes": 0}
+                    found = conn.execute(
+                        "SELECT row, text_offset, text_length, n_tokens, metadata, signature FROM docs "
+                        f"WHERE id IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    for row, offset, length, n_tokens, metadata, signature in found:
+                        text.seek(offset)
+                        terms = set(tokenize(text.read(length).decode("utf-8")))
+                        conn.executemany("DELETE FROM postings WHERE term = ? AND row = ?",
+                                         [(term, row) for term in terms])
+                        if signature is not None:
+                            keys = self.minhasher.band_keys(np.frombuffer(signature, dtype=np.uint32))
+                            conn.executemany("DELETE FROM lsh WHERE band = ? AND bucket = ? AND row = ?",
+                                             [(band, bucket, row) for band, bucket in keys])
+                        conn.execute("DELETE FROM docs WHERE row = ?", (row,))
+                        deltas["doc_count"] -= 1
+                        deltas["total_length"] -= n_tokens
+                        deltas["sightings"] -= json.loads(metadata).get("seen_count", 1)
+                        deltas["bytes"] -= length
+                        rows.append(row)
+                    self._bump(deltas, conn)
+
+                with self._lock:
+                    for row in rows:
+                        if row < self._vectors.shape[0]:
+                            self._vectors[row] = 0.0
+                        self._hits.pop(row, None)
+                deleted += len(rows)
+        finally:
+            conn.close()
+        return deleted
+
+    def record_hits(self, rows: Sequence[int]):
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                hits = self._hits.setdefault(row, [0, 0.0])
+                hits[0] += 1
+                hits[1] = now
+
+    def flush_usage(self):
+        """Writes buffered retrieval counts to SQLite."""
+        with self._lock:
+            if not self._hits:
+                return
+            pending, self._hits = self._hits, {}
+            with self._transaction():
+                self._conn.executemany(
+                    "UPDATE docs SET hits = hits + ?, last_access = MAX(last_access, ?) WHERE row = ?",
+                    [(hits, last_access, row) for row, (hits, last_access) in pending.items()],
+                )
+
+    def usage(self) -> List[Dict[str, Any]]:
+        self.flush_usage()
+        # A private read connection: WAL lets this scan run alongside searches and inserts
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            records = []
+            now = time.time()
+            for row, doc_id, size, metadata, hits, last_access in conn.execute(
+                    "SELECT row, id, text_length, metadata, hits, last_access FROM docs"):
+                meta = json.loads(metadata)
+                last_seen = meta.get("last_seen", now)
+                records.append({
+                    "row": row, "id": doc_id, "source": meta.get("source"), "size": size,
+                    "first_seen": meta.get("first_seen", last_seen), "last_seen": last_seen,
+                    "seen_count": meta.get("seen_count", 1), "hits": hits, "last_access": last_access,
+                })
+            return records
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        counters = self._counters(self._reader()[0])
+        return {"documents": counters["doc_count"], "bytes": counters["bytes"], "sightings": counters["sightings"]}
+
+    def get(self, rows: Sequence[int]) -> List[Document]:
+        if not rows:
+            return []
+        conn, text = self._reader()
+        placeholders = ",".join("?" * len(rows))
+        docs = {}
+        found = conn.execute(
+            f"SELECT row, id, text_offset, text_length, metadata FROM docs WHERE row IN ({placeholders})",
+            list(rows),
+        ).fetchall()
+        for row, doc_id, offset, length, metadata in found:
+            text.seek(offset)
+            docs[row] = Document(id=doc_id, content=text.read(length).decode("utf-8"), metadata=json.loads(metadata))
+        return [docs[row] for row in rows if row in docs]
+
+    def vector_search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        n = self._counters(self._reader()[0])["next_row"]
+        if n == 0:
+            return []
+        with self._lock:
+            if n > self._vectors.shape[0]:
+                self._reserve(n)  # another process appended past our mapping
+            vectors = self._vectors
+        query = query.astype(np.float32, copy=False)
+        cand_rows, cand_scores = [], []
+        # Block-wise scan: pages are read through the OS page cache, never copied in full
+        for start in range(0, n, self.SCAN_CHUNK):
+            scores = vectors[start:min(n, start + self.SCAN_CHUNK)] @ query
+            best = top_k(scores, k)
+            cand_rows.append(best + start)
+            cand_scores.append(scores[best])
+        rows, scores = np.concatenate(cand_rows), np.concatenate(cand_scores)
+        order = top_k(scores, k)
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def keyword_search(self, tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        if not tokens:
+            return []
+        conn = self._reader()[0]
+        counters = self._counters(conn)
+        n = counters["doc_count"]
+        if n == 0:
+            return []
+        avgdl = counters["total_length"] / n or 1.0
+        scores = {}
+        for term in set(tokens):
+            posting = conn.execute(
+                "SELECT p.row, p.tf, d.n_tokens FROM postings p JOIN docs d ON d.row = p.row WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for row, tf, length in posting:
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avgdl)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def close(self):
+        self.flush_usage()
+        with self._lock:
+            self._vectors.flush()
+            self._text_file.close()
+            self._conn.close()
+            for conn, text in self._readers:
+                conn.close()
+                text.close()
+            self._readers = []
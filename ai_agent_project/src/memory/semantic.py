@@ -1,84 +1,199 @@
-import json
 import os
-import math
-from typing import List, Dict, Optional, Any
-from datetime import datetime
-from pydantic import BaseModel
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.embedding import HashingEmbedder, tokenize
+from ai_agent_project.src.memory.store import Document, DocumentStore, InMemoryStore
+from ai_agent_project.src.memory.dedup import MinHasher, content_hash
+from ai_agent_project.src.memory.eviction import EvictionPolicy
 
-class Document(BaseModel):
-    id: str
-    content: str
-    metadata: Dict[str, Any] = {}
-    embedding: Optional[List[float]] = None
+# Reciprocal Rank Fusion constant: dampens the advantage of the very top ranks
+RRF_K = 60
 
 class SemanticMemory:
     """
     A lightweight Semantic Memory implementation.
     In a full production env, this would wrap ChromaDB/Qdrant/Pinecone.
-    Here, to keep it portable, we implement a simple JSON store with basic text overlap/dummy-embedding matching.
+    Here, to keep it portable, we embed documents with a local hashed n-gram embedding and
+    search them with a brute-force vector scan plus a BM25 inverted index for keyword
+    retrieval. Both are fused in "hybrid" mode.
+
+    Storage is pluggable (MEMORY_BACKEND):
+    - "json": `InMemoryStore`, everything in memory, persisted as a JSON snapshot plus an
+      append-only log that a background thread compacts every MEMORY_COMPACT_EVERY records.
+    - "mmap": `MappedStore`, embeddings in a memory-mapped file, texts in a blob file and
+      metadata/postings in SQLite; O(1) to open, only the top-k results are materialized.
+
+    Ingestion is deduplicated: an exact repeat (same normalized content hash) or a near
+    duplicate (MinHash Jaccard estimate >= MEMORY_DEDUP_THRESHOLD, candidates found via LSH)
+    bumps the stored document's `seen_count` / `last_seen` instead of inserting a copy.
+
+    Capacity is bounded by `EvictionPolicy` (document count, bytes, per-source TTL). A
+    background thread applies it every MEMORY_EVICT_INTERVAL seconds, or right away when
+    an insert pushes the store over capacity; `retrieve` never waits for it.
+
+    One instance per process is enough (see `get_semantic_memory`): retrievals run
+    concurrently, ingestion is serialized so a duplicate check and its insert are atomic,
+    and the stores coordinate with other worker processes through file locks / SQLite.
     """
-    def __init__(self, persistence_path: str = "ai_agent_project/src/memory/chroma_db/store.json"):
+    def __init__(self, persistence_path: str = "ai_agent_project/src/memory/chroma_db/store.json",
+                 backend: str = None, policy: EvictionPolicy = None):
         self.persistence_path = persistence_path
-        self.documents: List[Document] = []
-        self._load()
-
-    def add(self, content: str, metadata: Dict[str, Any] = None):
-        """Adds a document to knowledge base."""
-        doc = Document(
-            id=f"doc_{len(self.documents)+1}_{int(datetime.now().timestamp())}",
-            content=content,
-            metadata=metadata or {},
-            embedding=self._get_embedding(content)
+        self.backend = backend or settings.MEMORY_BACKEND
+        self.embedder = HashingEmbedder(dim=settings.MEMORY_EMBEDDING_DIM)
+        self.minhasher = MinHasher(num_perm=settings.MEMORY_MINHASH_PERM, bands=settings.MEMORY_LSH_BANDS)
+        self.store = self._open_store()
+        self._ingest_lock = threading.Lock()
+        self.policy = policy or EvictionPolicy.from_settings()
+        self.evicted = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._evictor = None
+        if self.policy.enabled:
+            self._evictor = threading.Thread(target=self._eviction_loop, name="memory-evictor", daemon=True)
+            self._evictor.start()
+
+    def _open_store(self) -> DocumentStore:
+        if self.backend == "mmap":
+            from ai_agent_project.src.memory.mmap_store import MappedStore
+            directory = os.path.splitext(self.persistence_path)[0] + ".mmap"
+            return MappedStore(directory, settings.MEMORY_EMBEDDING_DIM, self.minhasher,
+                               fsync=settings.MEMORY_LOG_FSYNC)
+        return InMemoryStore(
+            self.persistence_path,
+            settings.MEMORY_EMBEDDING_DIM,
+            self.embedder.embed_batch,
+            self.minhasher,
+            compact_every=settings.MEMORY_COMPACT_EVERY,
+            fsync=settings.MEMORY_LOG_FSYNC,
         )
-        self.documents.append(doc)
-        self._save()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def add(self, content: str, metadata: Dict[str, Any] = None) -> Document:
+        """Adds a document to knowledge base, or merges it into an existing duplicate."""
+        digest = content_hash(content)
+        signature = self.minhasher.signature(content)
+        vector = self._get_embedding(content)
+        tokens = tokenize(content)
+        with self._ingest_lock:
+            if settings.MEMORY_DEDUP_ENABLED:
+                duplicate = self.store.find_duplicate(digest, signature, settings.MEMORY_DEDUP_THRESHOLD)
+                doc = self.store.touch(duplicate[0]) if duplicate is not None else None
+                if doc is not None:
+                    print(f"Memory: Merged {duplicate[1]} duplicate of '{doc.content[:30]}...' "
+                          f"(seen {doc.metadata['seen_count']}x, dedup ratio {self.stats()['dedup_ratio']:.1%})")
+                    return doc
+
+            now = time.time()
+            doc = Document(
+                id=f"doc_{uuid.uuid4().hex}",
+                content=content,
+                metadata={**(metadata or {}), "content_hash": digest, "seen_count": 1, "first_seen": now, "last_seen": now}
+            )
+            self.store.add(doc, vector, tokens, signature)
         print(f"Memory: Added document '{content[:30]}...'")
+        stats = self.store.stats()
+        if self.policy.over_capacity(stats["documents"], stats["bytes"]):
+            self._wake.set()
+        return doc
 
-    def retrieve(self, query: str, limit: int = 3) -> List[Document]:
+    def retrieve(self, query: str, limit: int = 3, min_score: float = None, mode: str = None) -> List[Document]:
         """
-        Retrieves relevant documents. 
-        Uses a simple 'Jaccard-like' word overlap for this stateless demo 
-        instead of full BERT/OpenAI embeddings to avoid heavy dependencies.
+        Retrieves the `limit` most relevant documents.
+
+        mode="vector":  cosine similarity over the whole index in one vectorized pass
+                        (matches below `min_score` are dropped).
+        mode="keyword": BM25 over the inverted index; only postings of the query terms are read.
+        mode="hybrid":  Reciprocal Rank Fusion of both candidate lists.
         """
-        if not self.documents:
+        if not len(self.store):
             return []
-            
-        query_words = set(query.lower().split())
-        
-        scores = []
-        for doc in self.documents:
-            doc_words = set(doc.content.lower().split())
-            if not doc_words:
-                 score = 0
-            else:
-                 intersection = query_words.intersection(doc_words)
-                 score = len(intersection) / len(query_words) if query_words else 0
-            
-            scores.append((doc, score))
-            
-        # Sort by score desc
-        scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # Return top N with non-zero score
-        results = [doc for doc, score in scores if score > 0][:limit]
-        print(f"Memory: Retrieved {len(results)} matches for '{query}'")
+
+        mode = mode or settings.MEMORY_RETRIEVAL_MODE
+        min_score = settings.MEMORY_MIN_SCORE if min_score is None else min_score
+        # Fusion needs more than `limit` candidates from each side to reorder them
+        candidates = limit if mode != "hybrid" else limit * 5
+
+        ranked_lists = []
+        if mode in ("vector", "hybrid"):
+            hits = self.store.vector_search(self._get_embedding(query), candidates)
+            ranked_lists.append([row for row, score in hits if score >= min_score])
+        if mode in ("keyword", "hybrid"):
+            ranked_lists.append([row for row, _ in self.store.keyword_search(tokenize(query), candidates)])
+
+        if len(ranked_lists) == 1:
+            rows = ranked_lists[0][:limit]
+        else:
+            fused: Dict[int, float] = {}
+            for ranked in ranked_lists:
+                for rank, row in enumerate(ranked):
+                    fused[row] = fused.get(row, 0.0) + 1.0 / (RRF_K + rank + 1)
+            rows = sorted(fused, key=fused.get, reverse=True)[:limit]
+
+        results = self.store.get(rows)
+        self.store.record_hits(rows)
+        print(f"Memory: Retrieved {len(results)} matches for '{query}' ({mode})")
         return results
 
-    def _get_embedding(self, text: str) -> List[float]:
-        # Placeholder for real embedding logic
-        return [0.1, 0.2, 0.3] 
+    def stats(self) -> Dict[str, Any]:
+        """Store size and the share of ingested items that were merged as duplicates."""
+        stats = self.store.stats()
+        sightings = stats["sightings"]
+        stats["duplicates"] = sightings - stats["documents"]
+        stats["dedup_ratio"] = round(stats["duplicates"] / sightings, 4) if sightings else 0.0
+        stats["evicted"] = self.evicted
+        return stats
 
-    def _save(self):
-        os.makedirs(os.path.dirname(self.persistence_path), exist_ok=True)
-        data = [doc.dict() for doc in self.documents]
-        with open(self.persistence_path, 'w') as f:
-            json.dump(data, f, default=str)
+    def evict(self) -> int:
+        """Runs one eviction pass: expired documents, then lowest-value ones while over capacity."""
+        now = time.time()
+        victims = self.policy.select(self.store.usage(), now)
+        if not victims:
+            return 0
+        deleted = self.store.delete([v["id"] for v in victims])
+        expired = sum(1 for v in victims if self.policy.is_expired(v, now))
+        self.evicted += deleted
+        print(f"Memory: Evicted {deleted} documents ({expired} expired), {len(self.store)} left")
+        return deleted
 
-    def _load(self):
-        if os.path.exists(self.persistence_path):
+    def _eviction_loop(self):
+        while not self._closed:
+            self._wake.wait(settings.MEMORY_EVICT_INTERVAL)
+            self._wake.clear()
+            if self._closed:
+                break
             try:
-                with open(self.persistence_path, 'r') as f:
-                    data = json.load(f)
-                    self.documents = [Document(**d) for d in data]
+                self.evict()
             except Exception as e:
-                print(f"Memory: Failed to load existing store: {e}")
+                print(f"Memory: Eviction pass failed: {e}")
+
+    def compact(self, background: bool = False):
+        self.store.compact(background=background)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._evictor:
+            self._evictor.join()
+        self.store.close()
+
+    def _get_embedding(self, text: str):
+        return self.embedder.embed(text)
+
+
+_semantic_memory: Optional[SemanticMemory] = None
+_semantic_memory_lock = threading.Lock()
+
+
+def get_semantic_memory() -> SemanticMemory:
+    """Process-wide SemanticMemory shared by every agent run."""
+    global _semantic_memory
+    if _semantic_memory is None:
+        with _semantic_memory_lock:
+            if _semantic_memory is None:
+                _semantic_memory = SemanticMemory()
+    return _semantic_memory
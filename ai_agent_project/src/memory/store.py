@@ -0,0 +1,736 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from pydantic import BaseModel
+from ai_agent_project.src.utils.embedding import tokenize
+from ai_agent_project.src.utils.locks import FileLock, RWLock
+from ai_agent_project.src.memory.vector_index import VectorIndex
+from ai_agent_project.src.memory.keyword_index import BM25Index
+from ai_agent_project.src.memory.dedup import DedupIndex, MinHasher, content_hash
+
+
+class Document(BaseModel):
+    id: str
+    content: str
+    metadata: Dict[str, Any] = {}
+    embedding: Optional[List[float]] = None
+
+
+class DocumentStore(ABC):
+    """
+    Storage backend for SemanticMemory: documents addressed by integer row,
+    with their embeddings, BM25 postings and dedup signatures kept alongside.
+
+    Every document's metadata carries `content_hash`, `seen_count`, `first_seen` and
+    `last_seen`; a repeated sighting updates those instead of storing a copy. Retrieval
+    hits are counted in memory and persisted lazily (they only steer eviction).
+    Deleted rows are never reused.
+    """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def add(self, doc: Document, vector: np.ndarray, tokens: List[str], signature: np.ndarray) -> int:
+        """Persists a document and returns its row."""
+        pass
+
+    @abstractmethod
+    def find_duplicate(self, digest: str, signature: np.ndarray, threshold: float) -> Optional[Tuple[int, str]]:
+        """(row, "exact" | "near") of a stored duplicate, or None."""
+        pass
+
+    @abstractmethod
+    def touch(self, row: int) -> Optional[Document]:
+        """
+        Records another sighting of the document at `row` (seen_count + 1, last_seen = now).
+        Returns None if the row was deleted in the meantime.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> int:
+        """
+        Removes documents by id from every index and from disk; returns how many existed.
+        By id rather than row: rows of a store reloaded in the meantime may have been renumbered.
+        """
+        pass
+
+    @abstractmethod
+    def record_hits(self, rows: Sequence[int]):
+        """Counts a retrieval of each row (cheap, in memory)."""
+        pass
+
+    @abstractmethod
+    def usage(self) -> List[Dict[str, Any]]:
+        """
+        One record per live document for the eviction policy: row, id, source, size,
+        first_seen, last_seen, seen_count, hits, last_access.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """At least `documents`, `bytes` and `sightings` (adds + merged duplicates)."""
+        pass
+
+    @abstractmethod
+    def get(self, rows: Sequence[int]) -> List[Document]:
+        """Materializes the documents at `rows`, in the same order."""
+        pass
+
+    @abstractmethod
+    def vector_search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Up to k (row, cosine score) pairs, best first."""
+        pass
+
+    @abstractmethod
+    def keyword_search(self, tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        """Up to k (row, BM25 score) pairs, best first."""
+        pass
+
+    def compact(self, background: bool = False):
+        """Folds pending writes into the base files (no-op for stores that need none)."""
+        pass
+
+    def close(self):
+        pass
+
+
+def atomic_write(path: str, write_fn: Callable[[Any], None], mode: str = "w"):
+    """
+    Writes a file via a temp file + fsync + os.replace, so readers (and a crash at
+    any point) see either the old or the new file, never a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp_path, mode) as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _fsync_dir(directory)
+
+
+def _fsync_dir(directory: str):
+    # Persist the rename itself; not supported on every platform/filesystem
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class DocumentLog:
+    """
+    Snapshot + append-only log persistence for SemanticMemory.
+
+    - The snapshot is the JSON document list (the historical `store.json` format).
+    - Every change is appended to `<store>.log.jsonl` as one JSON record per line,
+      so an insert costs O(record) instead of rewriting the whole store.
+    - Compaction rotates the log aside (`<store>.log.compacting.jsonl`), writes a
+      new snapshot atomically and then drops the rotated log.
+
+    Replay is idempotent (records are keyed by document id), so a crash between
+    writing the snapshot and deleting the rotated log is harmless. A torn last
+    line from a crash mid-append is detected and truncated on load.
+
+    Several processes may share the files. Appends and rotation hold `lock` (an
+    exclusive file lock); snapshot writes hold `compaction_lock` exclusively and
+    loads hold it shared. Each log file starts with a header giving its id and the
+    id/final size of the log it replaced, so a process can `tail` records other
+    processes appended since its last read, across a rotation, or learn that it
+    fell behind a whole compaction and has to reload.
+    """
+
+    def __init__(self, snapshot_path: str, fsync: bool = True):
+        self.snapshot_path = snapshot_path
+        base = os.path.splitext(snapshot_path)[0]
+        self.log_path = base + ".log.jsonl"
+        self.rotated_path = base + ".log.compacting.jsonl"
+        self.lock = FileLock(base + ".log.lock")
+        self.compaction_lock = FileLock(base + ".compact.lock")
+        self.fsync = fsync
+        self.records_since_snapshot = 0
+        self._lock = threading.Lock()
+        # Read position: the log file (by header id) and offset up to which records are applied
+        self._log_id: Optional[str] = None
+        self._offset = 0
+        self._seen = None  # stat stamp of the log when we were last caught up
+
+    # --- Loading ---
+
+    def load(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Returns (snapshot records, log records) in write order.
+        The caller must hold `compaction_lock` (shared is enough).
+        """
+        with self.lock.acquire():
+            snapshot = []
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r") as f:
+                    snapshot = json.load(f)
+
+            records = []
+            if os.path.exists(self.rotated_path):
+                records.extend(self._read_log(self.rotated_path, repair=True)[0])
+            if not os.path.exists(self.log_path):
+                self._start_log(after=None, after_size=0)
+            log_records, self._offset = self._read_log(self.log_path, repair=True)
+            records.extend(log_records)
+            self._log_id = (self._header(self.log_path) or {}).get("log")
+            self._seen = _stamp(self.log_path)
+        self.records_since_snapshot = len(records)
+        return snapshot, records
+
+    def _read_log(self, path: str, start: int = 0, repair: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Reads complete records from `start`; returns (records, end offset).
+        With `repair` (only while holding `lock`), a torn tail is truncated away;
+        otherwise an incomplete last line is left for the next read.
+        """
+        records = []
+        good_offset = start
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn (or still being written)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                good_offset += len(line)
+                if record.get("op") != "begin":
+                    records.append(record)
+            f.seek(0, os.SEEK_END)
+            torn = f.tell() != good_offset
+
+        if torn and repair:
+            print(f"Memory: Discarding incomplete record at end of {os.path.basename(path)}")
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+        return records, good_offset
+
+    def _header(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as f:
+                line = f.readline()
+            return json.loads(line) if line.endswith(b"\n") else None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def changed(self) -> bool:
+        """Cheap check (one stat) for appends or a rotation by another process."""
+        return _stamp(self.log_path) != self._seen
+
+    def tail(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Records appended since the last load/tail, following one rotation if needed.
+        Returns None if we missed records that were already folded into a newer
+        snapshot; the caller must then reload.
+        """
+        header = self._header(self.log_path)
+        if header is None:
+            return None
+        try:
+            if header["log"] == self._log_id:
+                records, self._offset = self._read_log(self.log_path, self._offset)
+            elif header.get("after") == self._log_id:
+                rotated = self._header(self.rotated_path)
+                if rotated and rotated["log"] == self._log_id:
+                    records = self._read_log(self.rotated_path, self._offset)[0]
+                elif header.get("after_size") == self._offset:
+                    records = []  # we had read the old log to its end
+                else:
+                    return None
+                new_records, self._offset = self._read_log(self.log_path)
+                records.extend(new_records)
+                self._log_id = header["log"]
+                self.records_since_snapshot = 0
+            else:
+                return None
+        except FileNotFoundError:
+            return None  # rotated away between our checks
+        self._seen = _stamp(self.log_path)
+        self.records_since_snapshot += len(records)
+        return records
+
+    # --- Writing ---
+
+    def _start_log(self, after: Optional[str], after_size: int) -> str:
+        log_id = uuid.uuid4().hex
+        header = {"op": "begin", "log": log_id, "after": after, "after_size": after_size}
+        atomic_write(self.log_path, lambda f: f.write(json.dumps(header) + "\n"))
+        return log_id
+
+    def append(self, record: Dict[str, Any]):
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        """Appends several records with a single write (and fsync)."""
+        data = b"".join((json.dumps(record, default=str) + "\n").encode("utf-8") for record in records)
+        with self._lock, self.lock.acquire():
+            if not os.path.exists(self.log_path):
+                # Only after a crash mid-rotation; other processes will reload
+                self._start_log(after=None, after_size=0)
+            # Nobody else appended or rotated since our last read: we stay caught up
+            caught_up = _stamp(self.log_path) == self._seen
+            with open(self.log_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                end = f.tell()
+            if caught_up:
+                self._offset = end
+                self._seen = _stamp(self.log_path)
+            self.records_since_snapshot += len(records)
+
+    def rotate(self):
+        """
+        Moves the active log aside and starts a new one, so appends made during
+        compaction land in the new log. The caller holds `compaction_lock` and
+        `lock` and has applied every record written so far.
+        """
+        with self.lock.acquire():
+            header = self._header(self.log_path) or {}
+            size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+            if os.path.exists(self.log_path):
+                if os.path.exists(self.rotated_path):
+                    # A previous compaction did not finish; fold the active log into it
+                    records = self._read_log(self.log_path)[0]
+                    with open(self.rotated_path, "ab") as dst:
+                        for record in records:
+                            dst.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, self.rotated_path)
+            self._log_id = self._start_log(after=header.get("log"), after_size=size)
+            self._offset = os.path.getsize(self.log_path)
+            self._seen = _stamp(self.log_path)
+            self.records_since_snapshot = 0
+
+    def write_snapshot(self, docs: List[Dict[str, Any]]):
+        """Atomically replaces the snapshot, then drops the rotated log it supersedes."""
+        atomic_write(self.snapshot_path, lambda f: json.dump(docs, f, default=str))
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class InMemoryStore(DocumentStore):
+    """
+    The default backend: all documents, the embedding matrix and the BM25 index are held
+    in memory and persisted as a JSON snapshot + `DocumentLog`.
+
+    Embeddings are persisted with each snapshot as a `.npz` sidecar; if the sidecar is
+    missing or stale they are recomputed from the content. The BM25 index is persisted
+    the same way (`.bm25.json`).
+
+    Deleted rows become tombstones (None) until the next load; snapshots only contain
+    live documents. Retrieval counts are written into the metadata at snapshot time.
+
+    Reads run concurrently under a readers/writer lock. When several processes share the
+    files, each one applies the others' log records (`sync`) before reading or writing.
+    """
+
+    # Deletes applied per write-lock hold, so an eviction pass never stalls readers for long
+    DELETE_CHUNK = 64
+
+    def __init__(self, path: str, dim: int, embed_batch: Callable[[List[str]], np.ndarray],
+                 minhasher: MinHasher, compact_every: int = 500, fsync: bool = True):
+        self.path = path
+        self.dim = dim
+        self.embed_batch = embed_batch
+        self.minhasher = minhasher
+        self.compact_every = compact_every
+        self.log = DocumentLog(path, fsync=fsync)
+        self._rw = RWLock()
+        self._usage_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._reset()
+        with self.log.compaction_lock.acquire(shared=True):
+            self._load()
+
+    def _reset(self):
+        self.documents: List[Optional[Document]] = []
+        self.index = VectorIndex(self.dim)
+        self.keyword_index = BM25Index()
+        self.dedup = DedupIndex(self.minhasher)
+        self.sightings = 0
+        self.bytes = 0
+        self.live = 0
+        self._rows: Dict[str, int] = {}
+        self._sizes: List[int] = []
+        self._usage: Dict[int, List[float]] = {}  # row -> [hits, last_access]
+
+    def __len__(self) -> int:
+        return self.live
+
+    # --- Writes (exclusive) ---
+
+    def add(self, doc: Document, vector: np.ndarray, tokens: List[str], signature: np.ndarray) -> int:
+        self.sync()
+        with self._rw.write():
+            # Durable first: the record is on disk before the document becomes visible
+            self.log.append({"op": "add", "doc": doc.dict(exclude={"embedding"})})
+            row = self._apply_add(doc, vector, tokens, signature)
+        self._maybe_compact()
+        return row
+
+    def touch(self, row: int) -> Optional[Document]:
+        self.sync()
+        with self._rw.write():
+            doc = self.documents[row]
+            if doc is None:
+                return None
+            metadata = _sighted(doc.metadata)
+            self.log.append({"op": "touch", "id": doc.id, "metadata": metadata})
+            self._apply_touch(doc, metadata)
+        self._maybe_compact()
+        return doc
+
+    def delete(self, ids: Sequence[str]) -> int:
+        self.sync()
+        # No snapshot of ours may fall between the log append and the last chunk: it would
+        # fold the delete records away while the documents are still live in memory
+        with self._compact_lock:
+            with self._rw.read():
+                ids = [doc_id for doc_id in ids if doc_id in self._rows]
+            if not ids:
+                return 0
+            # Durable first, with one append for the whole batch. A concurrent sync() may
+            # replay these records before the loop below gets to them; both are idempotent.
+            self.log.append_many([{"op": "delete", "id": doc_id} for doc_id in ids])
+            for start in range(0, len(ids), self.DELETE_CHUNK):
+                with self._rw.write():
+                    for doc_id in ids[start:start + self.DELETE_CHUNK]:
+                        row = self._rows.get(doc_id)
+                        if row is not None:
+                            self._apply_delete(row)
+        self._maybe_compact()
+        return len(ids)
+
+    def _apply_add(self, doc: Document, vector: np.ndarray, tokens: List[str], signature: np.ndarray) -> int:
+        self.documents.append(doc)
+        row = self.index.add(vector)
+        self.keyword_index.add(row, tokens)
+        self.dedup.add(row, doc.metadata["content_hash"], signature)
+        self._rows[doc.id] = row
+        size = len(doc.content.encode("utf-8"))
+        self._sizes.append(size)
+        self.bytes += size
+        self.live += 1
+        self.sightings += doc.metadata.get("seen_count", 1)
+        if doc.metadata.get("hits"):
+            self._usage[row] = [doc.metadata["hits"], doc.metadata.get("last_access", 0)]
+        return row
+
+    def _apply_touch(self, doc: Document, metadata: Dict[str, Any]):
+        self.sightings += metadata.get("seen_count", 1) - doc.metadata.get("seen_count", 1)
+        doc.metadata = metadata
+
+    def _apply_delete(self, row: int):
+        doc = self.documents[row]
+        self.documents[row] = None
+        self.index.clear(row)
+        self.keyword_index.remove(row, tokenize(doc.content))
+        self.dedup.remove(row, doc.metadata["content_hash"])
+        del self._rows[doc.id]
+        with self._usage_lock:
+            self._usage.pop(row, None)
+        self.bytes -= self._sizes[row]
+        self.live -= 1
+        self.sightings -= doc.metadata.get("seen_count", 1)
+
+    def _apply_records(self, records: List[Dict[str, Any]]):
+        """Replays log records onto the current state; ids make every op idempotent."""
+        pending: Dict[str, Document] = {}
+        for record in records:
+            op = record.get("op")
+            if op == "add":
+                doc_id = record["doc"]["id"]
+                if doc_id not in self._rows and doc_id not in pending:
+                    pending[doc_id] = _with_dedup_fields(Document(**record["doc"]))
+            elif op == "touch":
+                if record["id"] in pending:
+                    pending[record["id"]].metadata = record["metadata"]
+                elif record["id"] in self._rows:
+                    self._apply_touch(self.documents[self._rows[record["id"]]], record["metadata"])
+            elif op == "delete":
+                if pending.pop(record["id"], None) is None and record["id"] in self._rows:
+                    self._apply_delete(self._rows[record["id"]])
+        if pending:
+            docs = list(pending.values())
+            vectors = self.embed_batch([d.content for d in docs])
+            for doc, vector in zip(docs, vectors):
+                self._apply_add(doc, vector, tokenize(doc.content), self.minhasher.signature(doc.content))
+
+    # --- Cross-process sync ---
+
+    def sync(self):
+        """Applies records other processes appended since our last read (one stat if none)."""
+        if not self.log.changed():
+            return
+        with self._rw.write():
+            records = self.log.tail()
+            if records is not None:
+                self._apply_records(records)
+                return
+        # We fell behind a whole compaction; reload (compaction lock first, as in compact())
+        with self.log.compaction_lock.acquire(shared=True), self._rw.write():
+            print("Memory: Store was compacted by another process, reloading")
+            self._reset()
+            self._load()
+
+    # --- Reads (shared) ---
+
+    def find_duplicate(self, digest: str, signature: np.ndarray, threshold: float) -> Optional[Tuple[int, str]]:
+        self.sync()
+        with self._rw.read():
+            return self.dedup.find(digest, signature, threshold)
+
+    def record_hits(self, rows: Sequence[int]):
+        now = time.time()
+        with self._usage_lock:
+            for row in rows:
+                usage = self._usage.setdefault(row, [0, 0.0])
+                usage[0] += 1
+                usage[1] = now
+
+    def usage(self) -> List[Dict[str, Any]]:
+        self.sync()
+        with self._rw.read():
+            live = [(row, doc) for row, doc in enumerate(self.documents) if doc is not None]
+            with self._usage_lock:
+                usage = dict(self._usage)
+            sizes = list(self._sizes)
+        records = []
+        for row, doc in live:
+            meta = doc.metadata
+            hits, last_access = usage.get(row, (0, 0.0))
+            records.append({
+                "row": row, "id": doc.id, "source": meta.get("source"), "size": sizes[row],
+                "first_seen": meta.get("first_seen", meta["last_seen"]), "last_seen": meta["last_seen"],
+                "seen_count": meta.get("seen_count", 1), "hits": hits, "last_access": last_access,
+            })
+        return records
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": self.live, "bytes": self.bytes, "sightings": self.sightings}
+
+    def get(self, rows: Sequence[int]) -> List[Document]:
+        with self._rw.read():
+            docs = [self.documents[row] for row in rows]
+        return [doc for doc in docs if doc is not None]
+
+    def vector_search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        self.sync()
+        with self._rw.read():
+            return [(row, score) for row, score in self.index.search(query, k) if self.documents[row] is not None]
+
+    def keyword_search(self, tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        self.sync()
+        with self._rw.read():
+            return self.keyword_index.search(tokens, k)
+
+    def close(self):
+        # Let an in-flight compaction finish so the snapshot and its sidecars agree
+        if self._compactor and self._compactor.is_alive():
+            self._compactor.join()
+
+    # --- Snapshots ---
+
+    @property
+    def _embeddings_path(self) -> str:
+        return os.path.splitext(self.path)[0] + ".embeddings.npz"
+
+    @property
+    def _keyword_index_path(self) -> str:
+        return os.path.splitext(self.path)[0] + ".bm25.json"
+
+    def compact(self, background: bool = False):
+        """
+        Folds the append log into a fresh snapshot (JSON store + sidecars).
+        The in-memory state is captured under the write lock; all disk I/O happens
+        outside it. Only one process compacts at a time; others skip.
+        """
+        if background:
+            if self._compactor and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="memory-compactor", daemon=True)
+            self._compactor.start()
+            return
+
+        with self._compact_lock, self.log.compaction_lock.acquire(blocking=False) as held:
+            if not held:
+                return
+            with self._rw.write(), self.log.lock.acquire():
+                # Catch up with other processes so the snapshot covers the whole rotated log
+                records = self.log.tail()
+                if records is None:
+                    self._reset()
+                    self._load()
+                else:
+                    self._apply_records(records)
+                self.log.rotate()
+                live = [row for row, doc in enumerate(self.documents) if doc is not None]
+                data = []
+                with self._usage_lock:
+                    for row in live:
+                        doc = self.documents[row].dict()
+                        if row in self._usage:
+                            hits, last_access = self._usage[row]
+                            doc["metadata"] = {**doc["metadata"], "hits": hits, "last_access": last_access}
+                        data.append(doc)
+                vectors = self.index.vectors[live]
+                signatures = np.array([self.dedup.signatures[row] for row in live],
+                                      dtype=np.uint32).reshape(len(live), self.minhasher.num_perm)
+                keyword_index = self.keyword_index.to_dict()
+            digest = _snapshot_digest(d["id"] for d in data)
+
+            # Snapshot rows are renumbered densely, so the postings are remapped to match
+            new_rows = {row: i for i, row in enumerate(live)}
+            keyword_index["postings"] = {term: [[new_rows[row], tf] for row, tf in pairs]
+                                         for term, pairs in keyword_index["postings"].items()}
+            keyword_index["doc_lengths"] = [[new_rows[row], n] for row, n in keyword_index["doc_lengths"]]
+            keyword_index["snapshot"] = digest
+
+            # Sidecars first: if we crash before the snapshot is replaced, their digest
+            # no longer matches the old snapshot and they are simply rebuilt on load
+            atomic_write(self._embeddings_path,
+                         lambda f: np.savez(f, vectors=vectors, signatures=signatures, snapshot=np.array(digest)), mode="wb")
+            atomic_write(self._keyword_index_path, lambda f: json.dump(keyword_index, f))
+            self.log.write_snapshot(data)
+            print(f"Memory: Compacted store ({len(data)} documents)")
+
+    def _maybe_compact(self):
+        if self.log.records_since_snapshot >= self.compact_every:
+            self.compact(background=True)
+
+    def _load(self):
+        """Loads snapshot + log into empty state. Caller holds `log.compaction_lock`."""
+        try:
+            snapshot, records = self.log.load()
+        except Exception as e:
+            print(f"Memory: Failed to load existing store: {e}")
+            return
+
+        # Inline embeddings (legacy placeholders) are ignored; vectors come from the sidecar
+        docs = [_with_dedup_fields(Document(**{**d, "embedding": None})) for d in snapshot]
+        digest = _snapshot_digest(d.id for d in docs)
+        vectors, signatures = self._load_embeddings(docs, digest)
+        self.keyword_index = self._load_keyword_index(docs, digest)
+        self.index.add_batch(vectors)
+        for row, doc in enumerate(docs):
+            self.documents.append(doc)
+            self._rows[doc.id] = row
+            self.dedup.add(row, doc.metadata["content_hash"], signatures[row])
+            self._sizes.append(len(doc.content.encode("utf-8")))
+            self.sightings += doc.metadata.get("seen_count", 1)
+            if doc.metadata.get("hits"):
+                self._usage[row] = [doc.metadata["hits"], doc.metadata.get("last_access", 0)]
+        self.bytes = sum(self._sizes)
+        self.live = len(docs)
+
+        self._apply_records(records)
+        if records:
+            print(f"Memory: Replayed {len(records)} log records")
+        self._maybe_compact()
+
+    def _load_embeddings(self, docs: List[Document], digest: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Embedding matrix and MinHash signatures of the snapshot documents."""
+        n = len(docs)
+        if not n:
+            return (np.zeros((0, self.index.dim), dtype=np.float32),
+                    np.zeros((0, self.minhasher.num_perm), dtype=np.uint32))
+        if os.path.exists(self._embeddings_path):
+            try:
+                with np.load(self._embeddings_path) as data:
+                    vectors = data["vectors"]
+                    signatures = data["signatures"] if "signatures" in data.files else None
+                    if str(data["snapshot"]) == digest and vectors.shape == (n, self.index.dim):
+                        if signatures is None or signatures.shape != (n, self.minhasher.num_perm):
+                            signatures = self._signatures(docs)
+                        return vectors.astype(np.float32, copy=False), signatures
+            except Exception as e:
+                print(f"Memory: Ignoring unreadable embeddings file: {e}")
+        print(f"Memory: (Re)computing embeddings for {n} documents...")
+        return self.embed_batch([d.content for d in docs]), self._signatures(docs)
+
+    def _signatures(self, docs: List[Document]) -> np.ndarray:
+        out = np.zeros((len(docs), self.minhasher.num_perm), dtype=np.uint32)
+        for i, doc in enumerate(docs):
+            out[i] = self.minhasher.signature(doc.content)
+        return out
+
+    def _load_keyword_index(self, docs: List[Document], digest: str) -> BM25Index:
+        if os.path.exists(self._keyword_index_path):
+            try:
+                with open(self._keyword_index_path, 'r') as f:
+                    data = json.load(f)
+                if data.get("snapshot") == digest:
+                    index = BM25Index.from_dict(data)
+                    if len(index) == len(docs):
+                        return index
+            except Exception as e:
+                print(f"Memory: Ignoring unreadable keyword index: {e}")
+        index = BM25Index()
+        for row, doc in enumerate(docs):
+            index.add(row, tokenize(doc.content))
+        return index
+
+
+def _with_dedup_fields(doc: Document) -> Document:
+    """Backfills dedup/usage metadata on documents stored before it existed."""
+    missing = {}
+    if "content_hash" not in doc.metadata:
+        missing["content_hash"] = content_hash(doc.content)
+    if "last_seen" not in doc.metadata:
+        # Unknown age: treat legacy documents as seen now rather than expiring them at once
+        now = time.time()
+        missing.update(first_seen=now, last_seen=now)
+    if missing:
+        doc.metadata = {**doc.metadata, **missing}
+    return doc
+
+
+def _sighted(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    return {**metadata, "seen_count": metadata.get("seen_count", 1) + 1, "last_seen": time.time()}
+
+
+def _snapshot_digest(ids) -> str:
+    """Identifies the exact document list a sidecar was built from."""
+    h = hashlib.sha1()
+    for doc_id in ids:
+        h.update(doc_id.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
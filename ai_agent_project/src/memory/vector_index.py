@@ -0,0 +1,73 @@
+from typing import List, Tuple
+import numpy as np
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first. O(N) selection + O(k log k) sort."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= scores.size:
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+class VectorIndex:
+    """
+    Dense float32 embedding matrix with brute-force cosine top-k.
+
+    Rows are L2-normalized embeddings, so a single matrix-vector product scores
+    the whole corpus. The matrix grows by doubling, so `add` is amortized O(dim).
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self._matrix = np.zeros((max(initial_capacity, 1), dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the populated rows."""
+        return self._matrix[:self._size]
+
+    def _reserve(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def add(self, vector: np.ndarray) -> int:
+        """Appends one embedding and returns its row."""
+        self._reserve(self._size + 1)
+        row = self._size
+        self._matrix[row] = vector
+        self._size += 1
+        return row
+
+    def add_batch(self, vectors: np.ndarray) -> range:
+        """Appends many embeddings at once (used when loading a store)."""
+        n = len(vectors)
+        self._reserve(self._size + n)
+        start = self._size
+        self._matrix[start:start + n] = vectors
+        self._size += n
+        return range(start, start + n)
+
+    def clear(self, row: int):
+        """Zeroes a deleted row; it then scores 0 against every query."""
+        self._matrix[row] = 0.0
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Returns up to k (row, cosine score) pairs, best first."""
+        if self._size == 0:
+            return []
+        scores = self.vectors @ query.astype(np.float32, copy=False)
+        rows = top_k(scores, k)
+        return [(int(r), float(scores[r])) for r in rows]
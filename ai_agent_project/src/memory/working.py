@@ -1,54 +1,177 @@
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Callable
 from ai_agent_project.src.core.types import Step, Thought, Action, ToolOutput
+from ai_agent_project.src.utils.tokens import get_tokenizer
+from ai_agent_project.src.config.settings import settings
+
+SEPARATOR = "-" * 20
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated, {len(text)} chars]"
+
+
+class _RenderedStep:
+    """A step's history text, rendered once: verbatim and compacted forms with token counts."""
+    __slots__ = ("full", "full_tokens", "compact", "compact_tokens")
+
+    def __init__(self, step: Step, observation_chars: int, count_tokens: Callable[[str], int]):
+        self.full = _render(step)
+        self.full_tokens = count_tokens(self.full)
+        self.compact = _render(step, limit=observation_chars)
+        self.compact_tokens = self.full_tokens if self.compact == self.full else count_tokens(self.compact)
+
+
+def _render(step: Step, limit: int = 0) -> str:
+    lines = [f"Step {step.step_id}:", f"  Thought: {_truncate(step.thought.text, limit)}"]
+    if len(step.actions) > 1:
+        # parallel tool calls: number each action and its observation
+        for i, (action, observation) in enumerate(zip(step.actions, step.observations), 1):
+            lines.append(f"  Action {i}: {action.tool_name}")
+            lines.append(f"  Input {i}: {_truncate(str(action.tool_args), limit)}")
+            lines.append(_observation(observation, limit, f" {i}"))
+    else:
+        if step.action:
+            lines.append(f"  Action: {step.action.tool_name}")
+            lines.append(f"  Input: {_truncate(str(step.action.tool_args), limit)}")
+        if step.observation:
+            lines.append(_observation(step.observation, limit))
+    lines.append(SEPARATOR)
+    return "\n".join(lines)
+
+
+def _observation(observation: ToolOutput, limit: int, label: str = "") -> str:
+    status = "Success" if observation.success else "Failed"
+    result = observation.result if observation.success else observation.error
+    return f"  Observation{label} ({status}): {_truncate(str(result), limit)}"
+
 
 class WorkingMemory:
     """
     Manages the short-term context for the agent.
     Stores the current goal, the history of steps (thoughts, actions, observations),
     and any temporary variables.
+
+    Each step is rendered once when it is added; `get_history` only joins the
+    cached text, optionally fitting it into a token budget.
+
+    `branch` gives a subtask its own history; steps added to a branch are also
+    recorded in the parent, which is safe to share between branch threads.
     """
-    def __init__(self):
+    def __init__(self, max_history_tokens: Optional[int] = None,
+                 keep_recent: Optional[int] = None,
+                 observation_chars: Optional[int] = None,
+                 count_tokens: Optional[Callable[[str], int]] = None):
         self.goal: Optional[str] = None
         self.steps: List[Step] = []
         self.context: Dict[str, Any] = {}
-        
+        self.max_history_tokens = settings.WORKING_MEMORY_HISTORY_TOKENS if max_history_tokens is None else max_history_tokens
+        self.keep_recent = settings.WORKING_MEMORY_KEEP_RECENT if keep_recent is None else keep_recent
+        self.observation_chars = settings.WORKING_MEMORY_OBSERVATION_CHARS if observation_chars is None else observation_chars
+        self.count_tokens = count_tokens or get_tokenizer().count
+        self._rendered: List[_RenderedStep] = []
+        self._full_text = ""
+        self._full_tokens = 0
+        self._parent: Optional["WorkingMemory"] = None
+        self._lock = threading.RLock()
+
     def initialize(self, goal: str):
         """Reset memory and set new goal."""
         self.clear()
         self.goal = goal
-        
+
     def clear(self):
         """Clear all memory."""
         self.goal = None
         self.steps = []
         self.context = {}
+        self._rendered = []
+        self._full_text = ""
+        self._full_tokens = 0
 
     def add_step(self, step: Step):
         """Add a completed step to the history."""
-        self.steps.append(step)
-        
-    def get_history(self) -> str:
-        """Format the history as a string for LLM context."""
-        if not self.steps:
+        with self._lock:
+            self.steps.append(step)
+            self._sync()
+        if self._parent is not None:
+            self._parent.add_step(step)
+
+    def branch(self, context: Optional[Dict[str, Any]] = None) -> "WorkingMemory":
+        """A child memory with the same goal, a copy of the context (plus `context`) and an empty history."""
+        child = WorkingMemory(self.max_history_tokens, self.keep_recent, self.observation_chars, self.count_tokens)
+        child.goal = self.goal
+        child.context = {**self.context, **(context or {})}
+        child._parent = self
+        return child
+
+    def _sync(self):
+        """Render steps not seen yet (also covers callers appending to `steps` directly)."""
+        if len(self._rendered) > len(self.steps):
+            self._rendered, self._full_text, self._full_tokens = [], "", 0
+        for step in self.steps[len(self._rendered):]:
+            rendered = _RenderedStep(step, self.observation_chars, self.count_tokens)
+            self._rendered.append(rendered)
+            self._full_text = f"{self._full_text}\n{rendered.full}" if self._full_text else rendered.full
+            self._full_tokens += rendered.full_tokens
+
+    def get_history(self, max_tokens: Optional[int] = None, exclude_last: bool = False) -> str:
+        """
+        Format the history as a string for LLM context.
+
+        `max_tokens` defaults to the configured budget (where 0 means unlimited).
+        Within a budget the newest `keep_recent` steps stay verbatim when they fit,
+        older steps use their truncated form, and the oldest are dropped once the
+        budget is spent. `exclude_last` leaves out the latest step, for callers
+        that budget it separately (see `render_last_step`).
+        """
+        with self._lock:
+            self._sync()
+            rendered = self._rendered[:-1] if exclude_last else self._rendered[:]
+            full_text, total = self._full_text, self._full_tokens
+            if exclude_last and rendered:
+                last = self._rendered[-1]
+                full_text = full_text[:len(full_text) - len(last.full) - 1]
+                total -= last.full_tokens
+        if not rendered:
             return "No previous steps."
-            
-        history_text = []
-        for step in self.steps:
-            history_text.append(f"Step {step.step_id}:")
-            history_text.append(f"  Thought: {step.thought.text}")
-            
-            if step.action:
-                history_text.append(f"  Action: {step.action.tool_name}")
-                history_text.append(f"  Input: {step.action.tool_args}")
-            
-            if step.observation:
-                status = "Success" if step.observation.success else "Failed"
-                result = step.observation.result if step.observation.success else step.observation.error
-                history_text.append(f"  Observation ({status}): {result}")
-            
-            history_text.append("-" * 20)
-            
-        return "\n".join(history_text)
+        if max_tokens is None:
+            max_tokens = self.max_history_tokens or None
+        if max_tokens is None or total <= max_tokens:
+            return full_text
+
+        parts: List[str] = []
+        remaining = max_tokens
+        for age, step in enumerate(reversed(rendered)):
+            if age < self.keep_recent and step.full_tokens <= remaining:
+                text, cost = step.full, step.full_tokens
+            elif step.compact_tokens <= remaining or not parts:
+                # the newest step is always shown, at least in compact form
+                text, cost = step.compact, step.compact_tokens
+            else:
+                break
+            parts.append(text)
+            remaining -= cost
+
+        omitted = len(rendered) - len(parts)
+        if omitted:
+            parts.append(f"({omitted} earlier step{'s' if omitted != 1 else ''} omitted)")
+        return "\n".join(reversed(parts))
+
+    def render_last_step(self) -> str:
+        """The latest step, verbatim ("" before the first step)."""
+        with self._lock:
+            self._sync()
+            return self._rendered[-1].full if self._rendered else ""
+
+    @property
+    def history_tokens(self) -> int:
+        """Token count of the full, unbudgeted history."""
+        with self._lock:
+            self._sync()
+            return self._full_tokens
 
     def get_last_step(self) -> Optional[Step]:
         if not self.steps:
@@ -0,0 +1,65 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+from ai_agent_project.src.planning.planner import Planner, SubTask, TaskStatus
+
+# (subtask, {dependency id: result}) -> (completed, result)
+SubtaskRunner = Callable[[SubTask, Dict[int, Optional[str]]], Tuple[bool, Optional[str]]]
+
+
+class PlanExecutor:
+    """
+    Runs a plan's subtasks as a DAG.
+
+    Every pending subtask whose dependencies have finished is started at once,
+    up to `max_parallel`. When a subtask finishes, its result is handed to the
+    subtasks that depend on it. Independent lookups therefore take about as
+    long as the slowest one, not the sum of all of them.
+
+    Ready subtasks come from the planner's PlanGraph, which already removed
+    cycles and unknown dependencies. A failed dependency counts as finished;
+    its result is None. Plan status is only changed on the calling thread.
+    """
+
+    def __init__(self, planner: Planner, run_subtask: SubtaskRunner, max_parallel: int = 4,
+                 should_stop: Callable[[], bool] = lambda: False,
+                 on_done: Callable[[SubTask], None] = lambda task: None):
+        self.planner = planner
+        self.run_subtask = run_subtask
+        self.max_parallel = max(1, max_parallel)
+        self.should_stop = should_stop
+        self.on_done = on_done
+
+    def _inputs(self, task: SubTask) -> Dict[int, Optional[str]]:
+        tasks = self.planner.graph.tasks
+        return {dep: tasks[dep].result for dep in task.dependencies}
+
+    def run(self):
+        if not self.planner.plan:
+            return
+        running: Dict[Future, SubTask] = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="subtask") as pool:
+            while True:
+                started = 0
+                while not self.should_stop() and len(running) < self.max_parallel:
+                    task = self.planner.take_ready()
+                    if task is None:
+                        break
+                    self.planner.update_task_status(task.id, TaskStatus.IN_PROGRESS)
+                    running[pool.submit(self.run_subtask, task, self._inputs(task))] = task
+                    started += 1
+                if started and len(running) > 1:
+                    print(f"Plan: Running {len(running)} subtasks in parallel.")
+                if not running:
+                    return
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        completed, result = future.result()
+                    except Exception as e:
+                        print(f"Plan: Task {task.id} raised {e!r}.")
+                        completed, result = False, None
+                    status = TaskStatus.COMPLETED if completed else TaskStatus.FAILED
+                    self.planner.update_task_status(task.id, status, result=result)
+                    self.on_done(task)
@@ -0,0 +1,148 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from ai_agent_project.src.planning.planner import SubTask, TaskStatus
+
+_FINISHED = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+
+class PlanGraph:
+    """
+    Dependency graph over a plan's subtasks, validated once when it is built.
+
+    Repairs (recorded in `repairs`): duplicate task ids keep their first task,
+    duplicate/self/unknown dependencies are dropped, and every edge that closes
+    a cycle is removed (depth-first, in plan order), so the result is a DAG.
+
+    Scheduling keeps, per task, the number of unfinished dependencies and a
+    ready queue of pending tasks that have none left; finishing a task touches
+    only its dependents. A failed task counts as finished for its dependents.
+    """
+
+    def __init__(self, subtasks: List[SubTask]):
+        self.repairs: List[str] = []
+        self.tasks: Dict[int, SubTask] = {}
+        for task in subtasks:
+            if task.id in self.tasks:
+                self.repairs.append(f"dropped duplicate task id {task.id}")
+                continue
+            self.tasks[task.id] = task
+        self._clean_dependencies()
+        self._break_cycles()
+
+        self.dependents: Dict[int, List[int]] = {tid: [] for tid in self.tasks}
+        for task in self.tasks.values():
+            for dep in task.dependencies:
+                self.dependents[dep].append(task.id)
+        self.order = self._topological_order()
+
+        self._waiting: Dict[int, int] = {}
+        self._ready: Deque[int] = deque()
+        self._finished = set()
+        self._completed = 0
+        for tid in self.order:
+            task = self.tasks[tid]
+            if task.status in _FINISHED:
+                self._finished.add(tid)
+                self._completed += task.status == TaskStatus.COMPLETED
+        for tid in self.order:
+            task = self.tasks[tid]
+            self._waiting[tid] = sum(dep not in self._finished for dep in task.dependencies)
+            if self._waiting[tid] == 0 and task.status == TaskStatus.PENDING:
+                self._ready.append(tid)
+
+    def _clean_dependencies(self):
+        for task in self.tasks.values():
+            cleaned = []
+            for dep in task.dependencies:
+                if dep == task.id:
+                    self.repairs.append(f"task {task.id}: dropped dependency on itself")
+                elif dep not in self.tasks:
+                    self.repairs.append(f"task {task.id}: dropped dependency on unknown task {dep}")
+                elif dep not in cleaned:
+                    cleaned.append(dep)
+            task.dependencies = cleaned
+
+    def _break_cycles(self):
+        """Iterative DFS; an edge into a task still on the stack closes a cycle and is removed."""
+        WHITE, GRAY, BLACK = 0, 1, 2
+        color = {tid: WHITE for tid in self.tasks}
+        for root in self.tasks:
+            if color[root] != WHITE:
+                continue
+            color[root] = GRAY
+            stack = [(root, 0)]
+            while stack:
+                tid, i = stack[-1]
+                deps = self.tasks[tid].dependencies
+                if i == len(deps):
+                    color[tid] = BLACK
+                    stack.pop()
+                    continue
+                stack[-1] = (tid, i + 1)
+                dep = deps[i]
+                if color[dep] == GRAY:
+                    deps.pop(i)
+                    stack[-1] = (tid, i)
+                    self.repairs.append(f"task {tid}: dropped dependency on {dep} (cycle)")
+                elif color[dep] == WHITE:
+                    color[dep] = GRAY
+                    stack.append((dep, 0))
+
+    def _topological_order(self) -> List[int]:
+        """Kahn's algorithm; ties keep plan order."""
+        indegree = {tid: len(task.dependencies) for tid, task in self.tasks.items()}
+        queue = deque(tid for tid in self.tasks if indegree[tid] == 0)
+        order = []
+        while queue:
+            tid = queue.popleft()
+            order.append(tid)
+            for child in self.dependents[tid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        return order
+
+    def mark(self, task_id: int, status: TaskStatus):
+        """Record a status change; releases dependents when a task finishes."""
+        if status not in _FINISHED or task_id in self._finished or task_id not in self.tasks:
+            return
+        self._finished.add(task_id)
+        self._completed += status == TaskStatus.COMPLETED
+        for child in self.dependents[task_id]:
+            self._waiting[child] -= 1
+            if self._waiting[child] == 0 and self.tasks[child].status == TaskStatus.PENDING:
+                self._ready.append(child)
+
+    def _skip_stale(self):
+        # tasks started through another path stay queued until they reach the head
+        while self._ready and self.tasks[self._ready[0]].status != TaskStatus.PENDING:
+            self._ready.popleft()
+
+    def peek_ready(self) -> Optional[SubTask]:
+        self._skip_stale()
+        return self.tasks[self._ready[0]] if self._ready else None
+
+    def pop_ready(self) -> Optional[SubTask]:
+        self._skip_stale()
+        return self.tasks[self._ready.popleft()] if self._ready else None
+
+    def is_complete(self) -> bool:
+        return self._completed == len(self.tasks)
+
+    def critical_path(self) -> List[int]:
+        """Longest dependency chain (task ids, first to last): the minimum number of sequential rounds."""
+        best: Dict[int, int] = {}
+        prev: Dict[int, Optional[int]] = {}
+        for tid in self.order:
+            deps = self.tasks[tid].dependencies
+            parent = max(deps, key=lambda d: best[d]) if deps else None
+            best[tid] = best[parent] + 1 if parent is not None else 1
+            prev[tid] = parent
+        if not best:
+            return []
+        tid = max(self.order, key=lambda t: best[t])
+        path = []
+        while tid is not None:
+            path.append(tid)
+            tid = prev[tid]
+        return path[::-1]
@@ -3,6 +3,22 @@ from enum import Enum
 from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
 from ai_agent_project.src.core.llm_provider import LLMProvider
+from ai_agent_project.src.core.prompt_layout import PromptLayout, PromptTemplate
+
+# Fixed instructions go first (system message) so every plan request shares the same cached prefix
+PLANNER_INSTRUCTIONS = """You are a project manager.
+Your task is to break down the user's goal into a list of steps.
+
+RESPONSE FORMAT:
+You MUST return valid JSON only. Do not add markdown or explanations.
+{
+  "subtasks": [
+    { "id": 1, "description": "precise action step", "dependencies": [] },
+    { "id": 2, "description": "precise action step", "dependencies": [1] }
+  ]
+}
+"""
+PLANNER_STEP = PromptTemplate("GOAL: {goal}\n\nRESPONSE:\n")
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
@@ -19,59 +35,33 @@ class SubTask(BaseModel):
     dependencies: List[int] = []
 
 class Plan(BaseModel):
+    """The plan as generated; scheduling and completion live in the planner's PlanGraph."""
     root_goal: str
     subtasks: List[SubTask] = []
-    
-    def get_active_task(self) -> Optional[SubTask]:
-        """Returns the first pending task whose dependencies are met."""
-        completed_ids = {t.id for t in self.subtasks if t.status == TaskStatus.COMPLETED}
-        
-        # 1. Try to find a task with satisfied dependencies
-        for task in self.subtasks:
-            if task.status == TaskStatus.PENDING:
-                # Check dependencies
-                if all(dep_id in completed_ids for dep_id in task.dependencies):
-                    return task
-        
-        # 2. Fallback: If we have pending tasks but all are blocked, return the first pending one.
-        # This handles cases where the LLM hallucinated circular or invalid dependencies.
-        pending_tasks = [t for t in self.subtasks if t.status == TaskStatus.PENDING]
-        if pending_tasks:
-            print(f"Plan: ⚠️ Logic Error - All {len(pending_tasks)} pending tasks are blocked. Forcing execution of Task {pending_tasks[0].id}.")
-            return pending_tasks[0]
-        
-        return None
-        
-    def is_complete(self) -> bool:
-        return all(t.status == TaskStatus.COMPLETED for t in self.subtasks)
 
 class Planner:
     def __init__(self, llm: LLMProvider):
         self.llm = llm
         self.plan: Optional[Plan] = None
+        self.graph = None  # PlanGraph of the current plan
+        self.layout = PromptLayout(PLANNER_INSTRUCTIONS)
+
+    def set_plan(self, plan: Plan) -> Plan:
+        """Validates and repairs the plan's dependency graph once, then schedules from it."""
+        from ai_agent_project.src.planning.graph import PlanGraph
+        self.graph = PlanGraph(plan.subtasks)
+        for repair in self.graph.repairs:
+            print(f"Plan: ⚠️ Repaired - {repair}.")
+        plan.subtasks = list(self.graph.tasks.values())
+        self.plan = plan
+        return plan
 
     def create_initial_plan(self, goal: str) -> Plan:
         """Generates a plan from the goal using the LLM."""
         print(f"Plan: Generating initial plan for '{goal}'...")
         
-        prompt = f"""
-You are a project manager.
-Your task is to break down the user's goal into a list of steps.
-
-GOAL: {goal}
-
-RESPONSE FORMAT:
-You MUST return valid JSON only. Do not add markdown or explanations.
-{{
-  "subtasks": [
-    {{ "id": 1, "description": "precise action step", "dependencies": [] }},
-    {{ "id": 2, "description": "precise action step", "dependencies": [1] }}
-  ]
-}}
-
-RESPONSE:
-"""
-        response = self.llm.generate(prompt)
+        system_prompt, prompt = self.layout.build(step=PLANNER_STEP.fill(goal=goal))
+        response = self.llm.generate(prompt, system_prompt=system_prompt)
         try:
             # Basic parsing helper
             import re
@@ -107,30 +97,44 @@ RESPONSE:
                 if not subtasks: 
                      raise ValueError("No valid subtasks found in JSON")
 
-                self.plan = Plan(root_goal=goal, subtasks=subtasks)
-                print(f"Plan: Created {len(subtasks)} steps.")
+                self.set_plan(Plan(root_goal=goal, subtasks=subtasks))
+                print(f"Plan: Created {len(self.plan.subtasks)} steps (critical path: {self.critical_path_length()}).")
                 return self.plan
             else:
                  raise ValueError("No JSON found")
                 
         except Exception as e:
             print(f"Plan: Error generating plan: {e}. Defaulting to single step.")
-            self.plan = Plan(root_goal=goal, subtasks=[SubTask(id=1, description=goal)])
-            return self.plan
+            return self.set_plan(Plan(root_goal=goal, subtasks=[SubTask(id=1, description=goal)]))
 
     def update_task_status(self, task_id: int, status: TaskStatus, result: str = None):
         if not self.plan:
             return
-            
-        for task in self.plan.subtasks:
-            if task.id == task_id:
-                task.status = status
-                if result:
-                    task.result = result
-                print(f"Plan: Task {task_id} marked as {status}.")
-                break
-                
+
+        task = self.graph.tasks.get(task_id)
+        if task is None:
+            return
+        task.status = status
+        if result:
+            task.result = result
+        self.graph.mark(task_id, status)
+        print(f"Plan: Task {task_id} marked as {status}.")
+
     def get_next_step(self) -> Optional[SubTask]:
+        """The next ready task, without starting it."""
+        if not self.plan:
+            return None
+        return self.graph.peek_ready()
+
+    def take_ready(self) -> Optional[SubTask]:
+        """Removes and returns the next task whose dependencies have all finished."""
         if not self.plan:
             return None
-        return self.plan.get_active_task()
+        return self.graph.pop_ready()
+
+    def is_complete(self) -> bool:
+        return bool(self.plan) and self.graph.is_complete()
+
+    def critical_path_length(self) -> int:
+        """Number of subtasks on the longest dependency chain, i.e. the fewest sequential rounds the plan needs."""
+        return len(self.graph.critical_path()) if self.plan else 0
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Type, Dict, Any
+from typing import Type, Dict, Any, Optional
 from pydantic import BaseModel
 from ai_agent_project.src.core.types import ToolInput, ToolOutput
 
@@ -9,6 +9,8 @@ class Tool(ABC):
     name: str = "base_tool"
     description: str = "Base tool"
     input_schema: Type[BaseModel]
+    timeout: Optional[float] = None  # seconds; None uses settings.TOOL_TIMEOUT
+    idempotent: bool = False         # no side effects: identical concurrent calls may share one execution
 
     @abstractmethod
     def execute(self, input_data: BaseModel) -> ToolOutput:
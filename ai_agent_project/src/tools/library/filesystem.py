@@ -38,6 +38,7 @@ class FileReadTool(Tool):
     name = "file_read"
     description = "Read contents of a file"
     input_schema = FileReadInput
+    idempotent = True
 
     def execute(self, input_data: FileReadInput) -> ToolOutput:
         try:
@@ -2,10 +2,10 @@ from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 from ai_agent_project.src.tools.base import Tool
 from ai_agent_project.src.core.types import ToolOutput
+from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.fetch import fetch_all
+from ai_agent_project.src.utils.html_extract import fetch_page_text
 from ddgs import DDGS
-import requests
-from bs4 import BeautifulSoup
-import re
 
 class WebSearchInput(BaseModel):
     query: str = Field(..., description="The search query")
@@ -15,30 +15,11 @@ class WebSearchTool(Tool):
     name = "web_search"
     description = "Search the internet for up-to-date information. Use this when you need current facts. Returns titles, links, snippets, and page content."
     input_schema = WebSearchInput
+    idempotent = True
 
-    def _fetch_page_content(self, url: str, timeout: int = 10) -> Optional[str]:
-        """Fetch and clean text content from a URL."""
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove clutter
-            for element in soup(["script", "style", "nav", "footer", "header", "aside", "form"]):
-                element.decompose()
-                
-            text = soup.get_text(separator=' ', strip=True)
-            text = re.sub(r'\s+', ' ', text).strip()
-            
-            # Limit length
-            return text[:2500] + "..." if len(text) > 2500 else text
-        except Exception as e:
-            # print(f"Failed to fetch {url}: {e}") # Reduce noise
-            return None
+    def _fetch_page_content(self, url: str, timeout: float = 10, deadline: Optional[float] = None) -> Optional[str]:
+        """Fetch and clean text content from a URL (streamed, stops at the text budget or `deadline`)."""
+        return fetch_page_text(url, timeout=timeout, deadline=deadline)
 
     def execute(self, input_data: WebSearchInput) -> ToolOutput:
         query = input_data.query
@@ -51,11 +32,15 @@ class WebSearchTool(Tool):
                 for r in ddgs.text(query, max_results=input_data.max_results):
                     raw_results.append(r)
             
-            # Enrich with page content
+            # Enrich with page content: all candidate pages are fetched at once under one
+            # deadline; the first WEB_FETCH_PAGES that arrive (in rank order) are used and
+            # the rest keep only their snippet.
+            fetches = fetch_all([res['href'] for res in raw_results], self._fetch_page_content,
+                                deadline=settings.WEB_FETCH_DEADLINE, max_workers=settings.WEB_FETCH_WORKERS)
             enriched_results = []
             fetched_count = 0
             
-            for res in raw_results:
+            for res, fetch in zip(raw_results, fetches):
                 item = {
                     "title": res['title'],
                     "link": res['href'],
@@ -63,19 +48,17 @@ class WebSearchTool(Tool):
                     "content": None
                 }
                 
-                # Fetch content for top 2 results
-                if fetched_count < 2:
-                    content = self._fetch_page_content(res['href'])
-                    if content:
-                        item["content"] = content
-                        fetched_count += 1
+                if fetch.content and fetched_count < settings.WEB_FETCH_PAGES:
+                    item["content"] = fetch.content
+                    fetched_count += 1
                 
                 enriched_results.append(item)
                 
             if not enriched_results:
                  return ToolOutput(success=False, result="No results found.")
 
-            return ToolOutput(success=True, result=enriched_results)
+            timings = {fetch.url: {"status": fetch.status, "ms": fetch.elapsed_ms} for fetch in fetches}
+            return ToolOutput(success=True, result=enriched_results, metadata={"fetch": timings})
 
         except Exception as e:
             return ToolOutput(success=False, error=str(e))
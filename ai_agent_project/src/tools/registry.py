@@ -1,15 +1,64 @@
-from typing import Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
 from ai_agent_project.src.tools.base import Tool
 
+
+class ToolSpec(BaseModel):
+    """Everything derived from one tool's class, computed once per catalog version."""
+    name: str
+    description: str
+    signature: str                # "web_search(query, max_results): <description>" for text prompts
+    parameters: Dict[str, Any]    # JSON schema of the input model
+    tool_call: Dict[str, Any]     # OpenAI / Ollama `tools` entry
+
+
+class ToolCatalog(BaseModel):
+    """Precompiled view of a registry at one version."""
+    version: int
+    specs: List[ToolSpec] = []
+    prompt_text: str = ""
+
+    def to_llm_format(self) -> List[Dict[str, Any]]:
+        return [{"name": s.name, "description": s.description, "parameters": s.parameters} for s in self.specs]
+
+    def to_tool_calls(self) -> List[Dict[str, Any]]:
+        return [s.tool_call for s in self.specs]
+
+
+def _compile(tool: Tool) -> ToolSpec:
+    parameters = tool.input_schema.model_json_schema()
+    args = ", ".join(parameters.get("properties", {}).keys())
+    return ToolSpec(
+        name=tool.name,
+        description=tool.description,
+        signature=f"{tool.name}({args}): {tool.description}",
+        parameters=parameters,
+        tool_call={"type": "function", "function": {
+            "name": tool.name, "description": tool.description, "parameters": parameters}},
+    )
+
+
 class ToolRegistry:
-    """Central repository for available tools"""
+    """
+    Central repository for available tools.
+
+    Schemas and prompt text are compiled into a ToolCatalog the first time they
+    are needed and reused until the next `register`, which bumps `version`.
+    """
 
     def __init__(self):
         self._tools: Dict[str, Tool] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self._catalog: Optional[ToolCatalog] = None
 
     def register(self, tool: Tool):
         """Register a new tool"""
-        self._tools[tool.name] = tool
+        with self._lock:
+            self._tools[tool.name] = tool
+            self.version += 1
+            self._catalog = None
         # print(f"DEBUG: Registered tool '{tool.name}'")
 
     def get(self, name: str) -> Optional[Tool]:
@@ -19,7 +68,27 @@ class ToolRegistry:
     def list_tools(self) -> List[Tool]:
         """Return all registered tools"""
         return list(self._tools.values())
-    
+
+    def catalog(self) -> ToolCatalog:
+        """The compiled catalog for the current set of tools."""
+        catalog = self._catalog
+        if catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    specs = [_compile(tool) for tool in self._tools.values()]
+                    self._catalog = ToolCatalog(version=self.version, specs=specs,
+                                                prompt_text="\n".join(s.signature for s in specs))
+                catalog = self._catalog
+        return catalog
+
+    def prompt_text(self) -> str:
+        """One `name(args): description` line per tool."""
+        return self.catalog().prompt_text
+
     def to_llm_format(self) -> List[Dict]:
         """Return list of tools explicitly formatted for LLM consumption"""
-        return [t.to_dict() for t in self._tools.values()]
+        return self.catalog().to_llm_format()
+
+    def to_tool_calls(self) -> List[Dict]:
+        """Tool definitions in the OpenAI / Ollama function-calling format."""
+        return self.catalog().to_tool_calls()
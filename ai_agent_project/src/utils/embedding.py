@@ -0,0 +1,81 @@
+import re
+import zlib
+from functools import lru_cache
+from typing import Iterable, List, Sequence
+import numpy as np
+
+# Words/numbers plus arithmetic operators, which change the meaning of a query entirely
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[-+*/^%=<>]")
+
+# Function words carry little meaning for matching and would otherwise dominate short queries
+STOPWORDS = frozenset("""
+a an the is are was were be been being am do does did of in on at to for from by with about as
+and or but if then than so that this these those it its it's what which who whom whose when where
+why how i me my we our you your he him his she her they them their there here can could would
+should will shall may might must please tell give show me current currently now today s
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word/number/operator tokens with stopwords removed (kept if nothing else is left)."""
+    words = _TOKEN_RE.findall(text.lower())
+    return [w for w in words if w not in STOPWORDS] or words
+
+
+@lru_cache(maxsize=1 << 18)
+def _hash(feature: str) -> int:
+    # crc32 is stable across processes (unlike hash()), so stored vectors stay valid after restart
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+class HashingEmbedder:
+    """
+    Dependency-free local embedding based on the hashing trick.
+
+    Word unigrams and character n-grams (within each word, with boundary
+    markers) are hashed into a fixed-size signed feature vector, then
+    L2-normalized, so the dot product of two embeddings is their cosine
+    similarity. Character n-grams make it tolerant to inflections,
+    possessives and small typos ("microsoft's" ~ "microsoft").
+    """
+
+    def __init__(self, dim: int = 512, char_ngrams: Sequence[int] = (3, 4), char_weight: float = 0.35):
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.dim = dim
+        self.char_ngrams = tuple(char_ngrams)
+        self.char_weight = char_weight
+        self._mask = dim - 1
+
+    def tokens(self, text: str) -> List[str]:
+        return tokenize(text)
+
+    def _features(self, text: str) -> Iterable:
+        for word in self.tokens(text):
+            if word.isdigit() or not word.isalnum():
+                # Numbers and operators must match exactly ("50 * 20" is not "50 * 30"), so weight them up and skip n-grams
+                yield "n:" + word, 2.0
+                continue
+            yield "w:" + word, 1.0
+            padded = f"<{word}>"
+            for n in self.char_ngrams:
+                for i in range(len(padded) - n + 1):
+                    yield "c:" + padded[i:i + n], self.char_weight
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = _hash(feature)
+            vec[h & self._mask] += weight if (h >> 31) & 1 else -weight
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            out[i] = self.embed(text)
+        return out
+
+    __call__ = embed
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+from pydantic import BaseModel
+
+
+class FetchResult(BaseModel):
+    """Outcome of fetching one URL within a batch."""
+    url: str
+    status: str                     # ok | failed | timeout
+    content: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+
+def fetch_all(urls: List[str], fetch: Callable[[str, float, float], Optional[str]],
+              deadline: float, max_workers: int = 4) -> List[FetchResult]:
+    """
+    Fetches `urls` concurrently and returns one FetchResult per URL, in order.
+
+    The whole batch is bounded by `deadline` seconds: pages that have not
+    arrived by then are reported as `timeout` and their futures cancelled.
+    `fetch(url, timeout, deadline)` returns the page text or None; besides the
+    per-read `timeout` it gets the batch's absolute `time.monotonic()` deadline
+    and must give up once it passes, so stragglers that already started stop
+    streaming instead of holding a worker (and interpreter exit) until their
+    byte budget is reached.
+    """
+    if not urls:
+        return []
+    started = time.perf_counter()
+    ends_at = time.monotonic() + deadline
+    finished = {}
+
+    def timed(url: str):
+        content = fetch(url, deadline, ends_at)
+        finished[url] = (time.perf_counter() - started) * 1000
+        return content
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))), thread_name_prefix="fetch")
+    try:
+        futures = [pool.submit(timed, url) for url in urls]
+        wait(futures, timeout=deadline)
+        results = []
+        for url, future in zip(urls, futures):
+            if not future.done():
+                future.cancel()
+                results.append(FetchResult(url=url, status="timeout", elapsed_ms=deadline * 1000))
+                continue
+            try:
+                content = future.result()
+            except Exception:
+                content = None
+            elapsed = finished.get(url, (time.perf_counter() - started) * 1000)
+            results.append(FetchResult(url=url, status="ok" if content else "failed",
+                                       content=content, elapsed_ms=round(elapsed, 1)))
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
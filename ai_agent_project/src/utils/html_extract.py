@@ -0,0 +1,251 @@
+import codecs
+import re
+import time
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Union
+import requests
+from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.http import get_transport
+from ai_agent_project.src.utils.page_cache import get_page_cache
+
+try:
+    from lxml import etree
+except ImportError:  # optional: the stdlib tokenizer is used instead
+    etree = None
+
+# Subtrees whose text never reaches the page text
+SKIP_TAGS = frozenset(["script", "style", "noscript", "template", "svg", "iframe",
+                       "nav", "footer", "header", "aside", "form"])
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _TextCollector:
+    """
+    Parser target: keeps the text outside skipped subtrees, whitespace-collapsed
+    and joined with single spaces, until `max_chars` is reached. No tree is built.
+    """
+
+    def __init__(self, max_chars: int, skip: Iterable[str]):
+        self.max_chars = max_chars
+        self.skip = frozenset(skip)
+        self.parts: List[str] = []
+        self.length = 0
+        self._pending: List[str] = []
+        self._skip_tag: Optional[str] = None  # root of the subtree being skipped
+        self._skipping = 0                     # open elements named `_skip_tag`
+        self.full = False
+
+    def start(self, tag, attrib=None):
+        self._flush()
+        tag = tag.lower()
+        if self._skip_tag is None:
+            if tag in self.skip:
+                self._skip_tag, self._skipping = tag, 1
+        elif tag == self._skip_tag:
+            self._skipping += 1
+
+    def end(self, tag):
+        # only the skipped root's own tag closes it: elements inside it may omit their
+        # end tags (<li>, <p>, <option>), so their start/end tags need not balance
+        self._flush()
+        if self._skip_tag is not None and tag.lower() == self._skip_tag:
+            self._skipping -= 1
+            if not self._skipping:
+                self._skip_tag = None
+
+    def data(self, data: str):
+        # a text node may arrive in pieces (split at feed boundaries); join them before collapsing
+        if not self._skipping and not self.full:
+            self._pending.append(data)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        text = _WHITESPACE.sub(" ", "".join(self._pending)).strip()
+        self._pending = []
+        if text:
+            self.parts.append(text)
+            self.length += len(text) + 1
+            # one character past the budget tells the caller the text was cut
+            self.full = self.length > self.max_chars
+
+    def close(self):
+        self._flush()
+
+    def text(self) -> str:
+        return " ".join(self.parts)
+
+
+class _StdlibTokenizer(HTMLParser):
+    """Event tokenizer used when lxml is not installed; feeds the same collector."""
+
+    # elements that never have an end tag, so they must not open a skipped subtree
+    _VOID = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input",
+                       "link", "meta", "source", "track", "wbr"])
+
+    def __init__(self, target: _TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self._VOID:
+            self.target.start(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self._VOID:
+            self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+class TextExtractor:
+    """
+    Incremental HTML-to-text extraction. Feed the body in chunks as it arrives
+    and stop feeding once `full` is set; the result is the same as extracting
+    the whole document and truncating it to `max_chars`.
+
+    Uses lxml's event (target) parser when available, otherwise the stdlib
+    HTMLParser tokenizer.
+    """
+
+    def __init__(self, max_chars: int, skip: Iterable[str] = SKIP_TAGS,
+                 encoding: Optional[str] = None, backend: Optional[str] = None):
+        self.collector = _TextCollector(max_chars, skip)
+        self.backend = backend or ("lxml" if etree is not None else "stdlib")
+        if self.backend == "lxml":
+            self._parser = etree.HTMLParser(target=self.collector, encoding=encoding,
+                                            remove_comments=True, remove_pis=True)
+            self._decoder = None
+        else:
+            self._parser = _StdlibTokenizer(self.collector)
+            self._decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+
+    @property
+    def full(self) -> bool:
+        return self.collector.full
+
+    def feed(self, chunk: Union[bytes, str]):
+        if self._decoder is not None and isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._parser.feed(chunk)
+
+    def close(self) -> str:
+        try:
+            self._parser.close()
+        except Exception:
+            pass  # lxml raises on documents it could not recover; the collected text is still valid
+        self.collector.close()
+        return self.collector.text()[:self.collector.max_chars]
+
+
+def extract_text(html: Union[bytes, str], max_chars: int = 2500, skip: Iterable[str] = SKIP_TAGS,
+                 backend: Optional[str] = None, chunk_size: int = 16384) -> str:
+    """Text of an HTML document, at most `max_chars` characters. Parsing stops at the budget."""
+    extractor = TextExtractor(max_chars, skip, backend=backend)
+    for i in range(0, len(html), chunk_size):
+        extractor.feed(html[i:i + chunk_size])
+        if extractor.full:
+            break
+    return extractor.close()
+
+
+def _cut(text: str, truncated: bool, max_chars: int, suffix: str) -> str:
+    if len(text) > max_chars:
+        text, truncated = text[:max_chars], True
+    return text + suffix if truncated and text else text
+
+
+def _body_chunks(response: requests.Response, chunk_size: int = 16384):
+    """
+    The response body as it arrives. urllib3 2's `read1` returns whatever is
+    buffered instead of blocking until `chunk_size` bytes (a slow server could
+    otherwise stall a single `iter_content` step for minutes).
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    while True:
+        chunk = read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def fetch_page_text(url: str, timeout: float = 10, max_chars: Optional[int] = None,
+                    max_bytes: Optional[int] = None, headers: Optional[Dict[str, str]] = None,
+                    skip: Iterable[str] = SKIP_TAGS, suffix: str = "...", use_cache: bool = True,
+                    deadline: Optional[float] = None) -> Optional[str]:
+    """
+    Streams `url` and returns its text, or None on failure or a non-HTML/text body.
+
+    Reading stops after `max_bytes` of body or once `max_chars` of text have
+    been extracted, and the connection is closed; text cut at the budget ends
+    with `suffix`.
+
+    With the page cache enabled, a fresh cached text is returned without any
+    request; a stale one is revalidated with a conditional GET, and served
+    as-is if the server cannot be reached.
+
+    `deadline` is an absolute `time.monotonic()` bound on the whole fetch
+    (`timeout` only bounds each connect/read): once it passes, the connection
+    is closed and None is returned, so a slow-drip server cannot hold the caller.
+    """
+    max_chars = max_chars or settings.WEB_FETCH_MAX_CHARS
+    max_bytes = max_bytes or settings.WEB_FETCH_MAX_BYTES
+    cache = get_page_cache() if use_cache and skip is SKIP_TAGS else None
+    page = cache.lookup(url, max_chars) if cache is not None else None
+    if page is not None and page.is_fresh:
+        cache.count("hits")
+        return _cut(page.text, page.truncated, max_chars, suffix)
+
+    request_headers = dict(headers or DEFAULT_HEADERS)
+    if page is not None:
+        request_headers.update(page.validators())
+    if deadline is not None:
+        timeout = max(0.1, min(timeout, deadline - time.monotonic()))
+    try:
+        response = get_transport().get(url, headers=request_headers, timeout=timeout, stream=True)
+        with response:
+            if response.status_code == 304 and page is not None:
+                cache.count("revalidated")
+                cache.touch(page, response.headers)
+                return _cut(page.text, page.truncated, max_chars, suffix)
+            if response.status_code in (404, 410):
+                if cache is not None:
+                    cache.delete(url)  # the page is gone; do not keep serving its old text
+                return None
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "text/html")
+            if "html" not in content_type and not content_type.startswith("text/"):
+                return None
+            # charset from the header only; lxml otherwise detects it from <meta>
+            encoding = response.encoding if "charset" in content_type else None
+            extractor = TextExtractor(max_chars, skip, encoding=encoding)
+            received = 0
+            for chunk in _body_chunks(response):
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None  # the caller has given up on this page; `with` closes the connection
+                extractor.feed(chunk)
+                received += len(chunk)
+                if extractor.full or received >= max_bytes:
+                    break
+            text = extractor.close()
+            truncated = extractor.full or received >= max_bytes
+    except (requests.ConnectionError, requests.Timeout):
+        # server unreachable: the last known text beats nothing
+        if page is not None:
+            cache.count("stale_served")
+            return _cut(page.text, page.truncated, max_chars, suffix)
+        return None
+    except Exception:
+        return None
+
+    if cache is not None and text:
+        cache.count("refetched" if page is not None else "misses")
+        cache.put(url, text, max_chars, truncated, response.headers)
+    return _cut(text, truncated, max_chars, suffix)
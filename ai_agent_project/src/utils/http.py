@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any, Optional, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ai_agent_project.src.config.settings import settings
+
+
+class HTTPTransport:
+    """
+    Process-wide HTTP transport with per-host keep-alive connection pools.
+
+    Every LLM backend and fetcher goes through one `requests.Session`, so a
+    request to a host that was already contacted reuses an idle socket instead
+    of paying a new TCP/TLS handshake.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = None,
+        pool_maxsize: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        max_retries: int = None,
+    ):
+        self.pool_connections = pool_connections or settings.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or settings.HTTP_POOL_MAXSIZE
+        self.timeout: Tuple[float, float] = (
+            connect_timeout or settings.HTTP_CONNECT_TIMEOUT,
+            read_timeout or settings.HTTP_READ_TIMEOUT,
+        )
+        retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+
+        # Only connection failures are retried: POSTs to an LLM are not idempotent
+        # once the server has started generating.
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.2),
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._requests_sent = 0
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared pools. Applies the default timeout if none is given."""
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self._requests_sent += 1
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns pool statistics.
+        `reused` per host is the number of requests that did not need a new socket.
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            served = pool.num_requests
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": opened,
+                "requests": served,
+                "reused": max(served - opened, 0),
+                # The pool queue is pre-filled with None placeholders; only real sockets count as idle
+                "idle": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0,
+            }
+
+        return {
+            "requests_sent": self._requests_sent,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "hosts": hosts,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_transport: Optional[HTTPTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Returns the process-wide transport, creating it on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HTTPTransport()
+    return _transport
+
+
+class AsyncHTTPTransport:
+    """
+    Asyncio counterpart of HTTPTransport built on `httpx.AsyncClient`.
+
+    An AsyncClient is bound to the event loop it was first used on, so one client
+    (with its own keep-alive pool) is kept per running loop.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = None,
+        max_keepalive: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_POOL_MAXSIZE * settings.HTTP_POOL_CONNECTIONS,
+            max_keepalive_connections=max_keepalive or settings.HTTP_POOL_MAXSIZE,
+        )
+        self.timeout = httpx.Timeout(
+            read_timeout or settings.HTTP_READ_TIMEOUT,
+            connect=connect_timeout or settings.HTTP_CONNECT_TIMEOUT,
+        )
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._requests_sent = 0
+
+    def client(self) -> httpx.AsyncClient:
+        """Returns the AsyncClient for the running loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self._requests_sent += 1
+        return await self.client().request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = 0
+        for client in list(self._clients.values()):
+            # httpx does not expose pool state publicly; read it defensively
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            connections += len(getattr(pool, "connections", []) or [])
+        return {
+            "requests_sent": self._requests_sent,
+            "event_loops": len(self._clients),
+            "open_connections": connections,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_async_transport: Optional[AsyncHTTPTransport] = None
+
+
+def get_async_transport() -> AsyncHTTPTransport:
+    """Returns the process-wide async transport, creating it on first use."""
+    global _async_transport
+    if _async_transport is None:
+        with _transport_lock:
+            if _async_transport is None:
+                _async_transport = AsyncHTTPTransport()
+    return _async_transport
+
+
+def ollama_chat(host: str, model: str, messages: list, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Non-streaming Ollama /api/chat call over the shared transport. Returns the parsed JSON body."""
+    payload = {"model": model, "messages": messages, "stream": False}
+    if options:
+        payload["options"] = options
+    response = get_transport().post(f"{host.rstrip('/')}/api/chat", json=payload)
+    response.raise_for_status()
+    return response.json()
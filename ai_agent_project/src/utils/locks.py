@@ -0,0 +1,122 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class RWLock:
+    """
+    Readers/writer lock for threads: any number of readers, or one writer.
+
+    Writer-preferring: once a writer is waiting, new readers queue behind it,
+    so a steady stream of reads cannot starve writes.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class FileLock:
+    """
+    Advisory lock on a file, shared between processes (flock on POSIX,
+    msvcrt byte-range locking on Windows, where shared mode degrades to exclusive).
+
+    Within a process the lock is re-entrant per thread and serialized across
+    threads, since flock itself does not distinguish threads of one process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    @contextmanager
+    def acquire(self, shared: bool = False, blocking: bool = True):
+        """Yields True if the lock is held, False if `blocking=False` and it is busy."""
+        if not self._thread_lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if not _lock_fd(fd, shared, blocking):
+                    os.close(fd)
+                    yield False
+                    return
+                self._fd = fd
+            self._depth += 1
+            try:
+                yield True
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    _unlock_fd(self._fd)
+                    os.close(self._fd)
+                    self._fd = None
+        finally:
+            self._thread_lock.release()
+
+
+def _lock_fd(fd: int, shared: bool, blocking: bool) -> bool:
+    if fcntl is not None:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+            return True
+        except BlockingIOError:
+            return False
+    mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+    try:
+        msvcrt.locking(fd, mode, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_fd(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,148 @@
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from pydantic import BaseModel
+from ai_agent_project.src.config.settings import settings
+from ai_agent_project.src.utils.cache import SQLiteCache
+
+# Query parameters that never change the page content
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|mc_cid|mc_eid|ref_src)$", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used as the cache key: lower-case scheme and host, no default
+    port, no fragment, tracking parameters dropped and the query sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _TRACKING_PARAMS.match(k))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class CachedPage(BaseModel):
+    """Extracted text of one URL plus what is needed to revalidate it."""
+    url: str
+    text: str
+    max_chars: int             # text budget the page was extracted with
+    truncated: bool            # the page had more text than `max_chars`
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float
+    fresh_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional GET headers; empty if the server gave no validators."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    On-disk cache of extracted page text, keyed by normalized URL.
+
+    A fresh entry is served without touching the network or the parser. A
+    stale one is revalidated with a conditional GET; a 304 only extends its
+    freshness. Freshness comes from the response's `Cache-Control: max-age`,
+    else `ttl`; `no-store` responses are not cached.
+
+    Stored in SQLite (WAL), so worker processes share one cache file; entries
+    do not expire in the table (stale ones are still needed for revalidation)
+    and the least recently read are evicted once it grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 128 * 1024 * 1024, ttl: float = 3600):
+        self.ttl = ttl
+        self.store = SQLiteCache(path, max_bytes=max_bytes, table="pages")
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "revalidated": 0, "refetched": 0, "stale_served": 0}
+
+    def count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """The stored entry for `url`, fresh or stale."""
+        value, _ = self.store.get(normalize_url(url))
+        return CachedPage(**value) if value is not None else None
+
+    def lookup(self, url: str, max_chars: int) -> Optional[CachedPage]:
+        """The entry if it holds enough text for `max_chars`, else None."""
+        page = self.get(url)
+        if page is None or (page.truncated and page.max_chars < max_chars):
+            return None
+        return page
+
+    def freshness(self, cache_control: Optional[str]) -> Optional[float]:
+        """Seconds a response stays fresh, or None if it must not be stored."""
+        cache_control = cache_control or ""
+        if "no-store" in cache_control.lower():
+            return None
+        match = _MAX_AGE.search(cache_control)
+        return float(match.group(1)) if match else self.ttl
+
+    def put(self, url: str, text: str, max_chars: int, truncated: bool, headers: Dict[str, str]) -> Optional[CachedPage]:
+        ttl = self.freshness(headers.get("Cache-Control"))
+        if ttl is None:
+            return None
+        now = time.time()
+        page = CachedPage(url=url, text=text, max_chars=max_chars, truncated=truncated,
+                          etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"),
+                          fetched_at=now, fresh_until=now + ttl)
+        self.store.set(normalize_url(url), page.model_dump())
+        return page
+
+    def touch(self, page: CachedPage, headers: Dict[str, str]) -> CachedPage:
+        """Record a 304: the stored text is still valid for another freshness period."""
+        ttl = self.freshness(headers.get("Cache-Control"))
+        page.fresh_until = time.time() + (ttl if ttl is not None else 0)
+        page.etag = headers.get("ETag") or page.etag
+        page.last_modified = headers.get("Last-Modified") or page.last_modified
+        self.store.set(normalize_url(page.url), page.model_dump())
+        return page
+
+    def delete(self, url: str):
+        self.store.delete(normalize_url(url))
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["revalidated"] + counters["misses"] + counters["refetched"]
+        counters["hit_rate"] = round((counters["hits"] + counters["revalidated"]) / lookups, 4) if lookups else 0.0
+        counters["ttl"] = self.ttl
+        counters["disk"] = self.store.stats()
+        return counters
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Process-wide page cache configured from settings (PAGE_CACHE_*); None when disabled."""
+    global _page_cache
+    if _page_cache is None and settings.PAGE_CACHE_ENABLED:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache(settings.PAGE_CACHE_PATH, max_bytes=settings.PAGE_CACHE_MAX_BYTES,
+                                        ttl=settings.PAGE_CACHE_TTL)
+    return _page_cache
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight,
+    further callers with the same key wait for its result instead of starting
+    their own. Nothing is kept once the call finishes (that is the caches' job).
+
+    `do` coalesces threads, `do_async` coalesces tasks on the same event loop.
+    Both return (result, shared); `shared` is True for callers that waited on
+    another caller's call. Exceptions are shared the same way as results.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._tasks: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._counters = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key: Optional[str], fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        if key is None:
+            return fn(), False
+        with self._lock:
+            self._counters["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._counters["executed"] += 1
+            else:
+                self._counters["coalesced"] += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result, False
+
+    def _finish(self, key: str):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    async def do_async(self, key: Optional[str], fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        if key is None:
+            return await fn(), False
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        with self._lock:
+            self._counters["calls"] += 1
+            task = self._tasks.get(slot)
+            leader = task is None
+            if leader:
+                task = self._tasks[slot] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._finish_async(slot))
+                self._counters["executed"] += 1
+            else:
+                self._counters["coalesced"] += 1
+        # shielded: a cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(task), not leader
+
+    def _finish_async(self, slot: Tuple[int, str]):
+        with self._lock:
+            self._tasks.pop(slot, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["in_flight"] = len(self._calls) + len(self._tasks)
+        counters["coalesced_ratio"] = round(counters["coalesced"] / counters["calls"], 4) if counters["calls"] else 0.0
+        return counters
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Process-wide SingleFlight group for `name` (e.g. "llm", "tool:web_search")."""
+    flight = _flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = _flights.get(name)
+            if flight is None:
+                flight = _flights[name] = SingleFlight(name)
+    return flight
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
@@ -0,0 +1,93 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+from ai_agent_project.src.config.settings import settings
+
+TRIM_MARKER = " ... [trimmed] ... "
+
+
+class Tokenizer(ABC):
+    """Counts and cuts text in model tokens."""
+
+    name: str = "tokenizer"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        pass
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        """Returns text within `max_tokens`, keeping the head or the tail of it."""
+        pass
+
+
+class ApproxTokenizer(Tokenizer):
+    """Fast estimate without a vocabulary: ~4 characters per token for English text."""
+
+    name = "approx"
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return int((len(text) + self.chars_per_token - 1) // self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        limit = max(int(max_tokens * self.chars_per_token) - len(TRIM_MARKER), 0)
+        if keep == "tail":
+            return TRIM_MARKER.lstrip() + text[len(text) - limit:] if limit else ""
+        return text[:limit] + TRIM_MARKER.rstrip() if limit else ""
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact counts with a tiktoken encoding (optional dependency)."""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+        self._marker = len(self._encoding.encode(TRIM_MARKER))
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "head") -> str:
+        ids = self._encoding.encode(text, disallowed_special=())
+        if len(ids) <= max_tokens:
+            return text
+        limit = max(max_tokens - self._marker, 0)
+        if not limit:
+            return ""
+        if keep == "tail":
+            return TRIM_MARKER.lstrip() + self._encoding.decode(ids[len(ids) - limit:])
+        return self._encoding.decode(ids[:limit]) + TRIM_MARKER.rstrip()
+
+
+def make_tokenizer(spec: str) -> Tokenizer:
+    """
+    Builds a tokenizer from a spec: "approx" or "tiktoken[:<encoding>]".
+    Falls back to the approximate counter if the backend is unavailable.
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "tiktoken":
+        try:
+            return TiktokenTokenizer(arg or "cl100k_base")
+        except Exception as e:  # not installed, or the encoding can't be fetched
+            print(f"[Tokens] {spec} unavailable ({e}), using approximate counts.")
+    return ApproxTokenizer()
+
+
+_tokenizer: Optional[Tokenizer] = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer() -> Tokenizer:
+    """Process-wide tokenizer selected by settings.TOKENIZER."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = make_tokenizer(settings.TOKENIZER)
+    return _tokenizer
@@ -1,10 +1,15 @@
+import os
+import sys
 from flask import Flask, request, jsonify
-from ollama import Client
+
+# Reuse the pooled keep-alive transport from ai_agent_project (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_agent_project.src.utils.http import get_transport, ollama_chat
 
 app = Flask(__name__)
 
 # Connect to Ollama running on Ubuntu server
-client = Client(host="http://192.168.1.13:11434")
+OLLAMA_HOST = "http://192.168.1.13:11434"
 PORT = 5001
 
 @app.route("/ask", methods=["GET"])
@@ -15,7 +20,8 @@ def ask_model():
         return jsonify({"error": "Missing 'prompt' parameter"}), 400
 
     try:
-        response = client.chat(
+        response = ollama_chat(
+            OLLAMA_HOST,
             model="mistral:latest",
             messages=[{"role": "user", "content": prompt}]
         )
@@ -30,6 +36,11 @@ def ask_model():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/stats", methods=["GET"])
+def http_stats():
+    return jsonify(get_transport().stats())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=PORT)
 
@@ -1,8 +1,13 @@
+import os
+import sys
 from ddgs import DDGS
-from ollama import Client
 import argparse
-import requests
-from bs4 import BeautifulSoup
+
+# Share the pooled HTTP transport with the agent projects (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_agent_project.src.utils.http import ollama_chat
+from ai_agent_project.src.utils.fetch import fetch_all
+from ai_agent_project.src.utils.html_extract import fetch_page_text
 
 def search_web(query, max_results=3):
     """Search the web using DuckDuckGo."""
@@ -18,33 +23,14 @@ def search_web(query, max_results=3):
         return []
     return results
 
-def fetch_page_content(url, timeout=10):
-    """Fetch and extract text from a URL."""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script, style, nav, footer, and other clutter
-        for element in soup(["script", "style", "nav", "footer", "header", "aside", "form"]):
-            element.decompose()
-            
-        text = soup.get_text(separator=' ', strip=True)
-        # Clean up excessive whitespace
-        import re
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Limit text length (approx 2000 chars per source)
-        return text[:2000] + "..." if len(text) > 2000 else text
-    except Exception as e:
-        print(f"Failed to fetch {url}: {e}")
-        return None
+def fetch_page_content(url, timeout=10, deadline=None):
+    """Fetch and extract text from a URL (streamed; reading stops at ~2000 chars of text or at `deadline`)."""
+    text = fetch_page_text(url, timeout=timeout, max_chars=2000, deadline=deadline)
+    if text is None:
+        print(f"Failed to fetch {url}")
+    return text
 
-def summarize_results(query, results, model_name="mistral:latest", host="http://192.168.1.13:11434"):
+def summarize_results(query, results, model_name="mistral:latest", host="http://192.168.1.13:11434", fetch_deadline=8):
     """Summarize search results using Ollama."""
     print(f"Summarizing with model: {model_name}...")
     
@@ -54,17 +40,14 @@ def summarize_results(query, results, model_name="mistral:latest", host="http://
     # Prepare context from results
     context_text = ""
     
-    # Try to fetch content for the TOP 2 results
+    # Fetch all result pages at once; use the TOP 2 that arrive before the deadline
+    print(f"Fetching detailed content from {len(results)} pages (deadline {fetch_deadline:g}s)...")
+    fetches = fetch_all([res['href'] for res in results], fetch_page_content, deadline=fetch_deadline)
     fetched_count = 0
-    for res in results:
-        if fetched_count >= 2:
-            break
-            
-        url = res['href']
-        print(f"Fetching detailed content from: {url}")
-        page_content = fetch_page_content(url)
-        if page_content:
-            context_text += f"Content from {res['title']} ({url}):\n{page_content}\n\n"
+    for res, fetch in zip(results, fetches):
+        print(f"  {fetch.status:>7} {fetch.elapsed_ms:7.0f} ms  {fetch.url}")
+        if fetch.content and fetched_count < 2:
+            context_text += f"Content from {res['title']} ({fetch.url}):\n{fetch.content}\n\n"
             fetched_count += 1
     
     # Add snippets for all results as backup
@@ -83,8 +66,8 @@ def summarize_results(query, results, model_name="mistral:latest", host="http://
     """
 
     try:
-        client = Client(host=host)
-        response = client.chat(
+        response = ollama_chat(
+            host,
             model=model_name,
             messages=[{"role": "user", "content": prompt}]
         )
@@ -97,6 +80,7 @@ def main():
     parser.add_argument("query", nargs="*", help="The search query")
     parser.add_argument("--model", default="mistral:latest", help="Ollama model to use")
     parser.add_argument("--host", default="http://192.168.1.13:11434", help="Ollama host URL")
+    parser.add_argument("--fetch-deadline", type=float, default=8, help="Seconds allowed for fetching all result pages")
     
     args = parser.parse_args()
     
@@ -117,7 +101,7 @@ def main():
         print(f"\nFound {len(results)} results. Generating summary...\n")
         
         # 2. Summarize
-        summary = summarize_results(query, results, model_name=args.model, host=args.host)
+        summary = summarize_results(query, results, model_name=args.model, host=args.host, fetch_deadline=args.fetch_deadline)
         
         print("-" * 40)
         print("SUMMARY")